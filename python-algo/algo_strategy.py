@@ -1,4 +1,5 @@
 import gamelib
+import gamelib.simulator
 import random
 import math
 import warnings
@@ -16,7 +17,8 @@ Advanced strategy tips:
 
   - The GameState.map object can be manually manipulated to create hypothetical
   board states. Though, we recommended making a copy of the map to preserve
-  the actual current map state.
+  the actual current map state. GameState.clone() makes a cheap copy that only
+  copies the locations you change.
 """
 
 
@@ -48,6 +50,8 @@ class AlgoStrategy(gamelib.AlgoCore):
         # This is a good place to do initial setup
         self.scored_on_locations = []
         self.enemy_unit_death_locations = []
+        # on_action_frame only looks at breaches and deaths, so the other frames do not need to be decoded
+        self.set_action_frame_filter(["breach", "death"])
         # self.launch
         # print("i am currrently in", os.getcwd())
         f = open("weights.txt", "r")
@@ -77,14 +81,14 @@ class AlgoStrategy(gamelib.AlgoCore):
         num_pos = int(self.weights[1] * num_launch_pos)
         edge_locs = [[[i, 13 - i]] for i in range(14)] + [[[i, i - 14]] for i in range(14, 27)]
         # gamelib.debug_write("There are {} launch_pos".format(len(edge_locs)))
-        gamelib.debug_write("launchs pos are {}".format(edge_locs))
+        gamelib.log(gamelib.DEBUG, "launchs pos are {}", edge_locs)
         launch_pos = edge_locs[num_pos]
 
         # print("launch_pos is ", launch_pos)
-        gamelib.debug_write("Trying to launch at {}".format(launch_pos))
+        gamelib.log(gamelib.INFO, "Trying to launch at {}", launch_pos)
         # if game_state.get_resources(0)[0] > 0:
         num_spawned = game_state.attempt_spawn(PING, launch_pos, 30)
-        gamelib.debug_write("spawned {} at launch_pos {} ".format(num_spawned, launch_pos))
+        gamelib.log(gamelib.INFO, "spawned {} at launch_pos {} ", num_spawned, launch_pos)
 
 
         # for location in self.scored_on_locations:
@@ -166,13 +170,10 @@ class AlgoStrategy(gamelib.AlgoCore):
 
     def get_enemy_front_row(self, game_state, unit_type = None):
         front_row = 17
+        spatial_index = game_state.game_map.get_spatial_index()
         for row in range(14, 16):
-            for col in range(3 + row-14, 27 - 3 - (row-14)):
-                if game_state.contains_stationary_unit([col, row]):
-                    for unit in game_state.game_map[col, row]:
-                        if unit.player_index == 1 \
-                                and (unit_type is None or unit.unit_type == unit_type):
-                            return row
+            if spatial_index.count(1, unit_type, range(3 + row-14, 27 - 3 - (row-14)), [row]):
+                return row
         return front_row
 
     def build_defences(self, location_list, firewall_unit, game_state, row = None):
@@ -241,33 +242,33 @@ class AlgoStrategy(gamelib.AlgoCore):
         # By asking attempt_spawn to spawn 1000 units, it will essentially spawn as many as we have resources for
         game_state.attempt_spawn(EMP, [24, 10], 1000)
 
-    def least_damage_spawn_location(self, game_state, location_options):
+    def least_damage_spawn_location(self, game_state, location_options, unit_type=None, count=1):
         """
         This function will help us guess which location is the safest to spawn moving units from.
         It gets the path the unit will take then checks locations on that path to
         estimate the path's damage risk.
+        If a unit type is given, the attack with count units of that type is simulated from every
+        location at once with gamelib.simulator.simulate_batch instead, and the location that scores best
+        is returned. That model never destroys firewalls and ignores the units already on the map,
+        so it is only used when asked for, e.g. least_damage_spawn_location(game_state, options, PING, 15).
         """
+        if unit_type is not None:
+            candidates = [[(unit_type, location[0], location[1])] * count for location in location_options]
+            return location_options[gamelib.simulator.simulate_batch(game_state, candidates).best()]
+
         damages = []
         # Get the damage estimate each path will take
         for location in location_options:
             path = game_state.find_path_to_edge(location)
-            damage = 0
-            for path_location in path:
-                # Get number of enemy destructors that can attack the final location and multiply by destructor damage
-                damage += len(game_state.get_attackers(path_location, 0)) * gamelib.GameUnit(DESTRUCTOR, game_state.config).damage_i
+            # Sum the damage per frame enemy destructors deal on each location of the path
+            damage = game_state.get_path_damage(path, 0)
             damages.append(damage)
 
         # Now just return the location that takes the least damage
         return location_options[damages.index(min(damages))]
 
     def detect_enemy_unit(self, game_state, unit_type=None, valid_x = None, valid_y = None):
-        total_units = 0
-        for location in game_state.game_map:
-            if game_state.contains_stationary_unit(location):
-                for unit in game_state.game_map[location]:
-                    if unit.player_index == 1 and (unit_type is None or unit.unit_type == unit_type) and (valid_x is None or location[0] in valid_x) and (valid_y is None or location[1] in valid_y):
-                        total_units += 1
-        return total_units
+        return game_state.game_map.get_spatial_index().count(1, unit_type, valid_x, valid_y)
 
     def filter_blocked_locations(self, locations, game_state):
         filtered = []
@@ -280,11 +281,12 @@ class AlgoStrategy(gamelib.AlgoCore):
         """
         This is the action frame of the game. This function could be called
         hundreds of times per turn and could slow the algo down so avoid putting slow code here.
+        Frames without a breach or death are skipped, see set_action_frame_filter in on_game_start.
         Processing the action frames is complicated so we only suggest it if you have time and experience.
         Full doc on format of a game frame at: https://docs.c1games.com/json-docs.html
         """
         # Let's record at what position we get scored on
-        state = json.loads(turn_string)
+        state = gamelib.codec.parse(turn_string)
         events = state["events"]
         breaches = events["breach"]
         deaths = events["death"]
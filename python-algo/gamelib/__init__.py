@@ -16,14 +16,30 @@ Investigating it is useful for advanced players interested in getting data from
 The Navigation class in navigation.py contains functions related to pathfinding, which are used by GameState in pathing related functions. 
 Investigating it is useful for advanced player who want to optimize the slow default pathing algorithm we provide. \n 
 
-util.py contains a small handful of functions that help with communication, including the debug-printing function, debug_write().
+The TurnBudget class in budget.py times each turn against the engine's time limits. \n
+
+The BackgroundTask class in background.py runs planning on a worker thread during the action phase. \n
+
+The WorkerPool class in parallel.py evaluates candidates on several worker processes. \n
+
+codec.py decodes the messages from the game engine and encodes the turns sent back. \n
+
+The CoverageMap class in coverage.py holds how much damage firewalls deal to each location. \n
+
+The LRUCache class in cache.py is a bounded cache used to reuse work between turns. \n
+
+The SpatialIndex class in spatial_index.py holds where each player's firewalls are. \n
+
+simulator.py plays out the action phase that follows a deploy, to predict its outcome. \n
+
+util.py contains a small handful of functions that help with communication, including the debug-printing function, debug_write(), and log().
 """
 
 from .algocore import AlgoCore
-from .util import debug_write
+from .util import debug_write, log, set_log_level, set_log_buffering, DEBUG, INFO, WARNING, ERROR, OFF
 from .game_state import GameState
 from .unit import GameUnit
 from .game_map import GameMap
 
-__all__ = ["algocore", "game_state", "game_map", "navigation", "unit", "util"]
+__all__ = ["algocore", "background", "budget", "cache", "codec", "coverage", "game_state", "game_map", "navigation", "parallel", "simulator", "spatial_index", "unit", "util"]
  
\ No newline at end of file
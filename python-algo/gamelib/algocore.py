@@ -1,7 +1,9 @@
-import json
-
 from .game_state import GameState
-from .util import get_command, debug_write, BANNER_TEXT, send_command
+from .util import get_command, debug_write, flush_log, BANNER_TEXT, send_command
+from . import codec
+from .budget import TurnBudget
+from .background import BackgroundTask
+from .parallel import WorkerPool
 
 class AlgoCore(object):
     """
@@ -10,10 +12,43 @@ class AlgoCore(object):
 
     Attributes :
         * config (JSON): json object containing information about the game
+        * action_frame_events (list): If set, only action frames with at least one of these kinds of events are 
+          passed to on_action_frame. None passes every frame. See set_action_frame_filter.
+        * action_frame_interval (int): Only every action_frame_interval-th frame of an action phase is passed to on_action_frame
+        * turn_budget (TurnBudget): Times each call to on_turn against the engine's time limits. Created from the config before on_game_start.
+        * background_task (BackgroundTask): The task last started with run_in_background, or None
+        * background_result: The result of background_task, collected when the turn message arrives and before on_turn is called
+        * background_timeout (float): Seconds to wait for a cancelled background task to return its result
+        * worker_pool (WorkerPool): The pool started with start_worker_pool, or None
 
     """
     def __init__(self):
         self.config = None
+        self.action_frame_events = None
+        self.action_frame_interval = 1
+        self._action_frame_count = 0
+        self.turn_budget = TurnBudget()
+        self.background_task = None
+        self.background_result = None
+        self.background_timeout = 0.05
+        self.worker_pool = None
+
+    def set_action_frame_filter(self, event_kinds=None, interval=1):
+        """Limits which action frames are passed to on_action_frame. 
+        Skipped frames are recognised with a quick scan of the raw message and never decoded.
+
+        Args:
+            event_kinds: Only pass frames that have at least one event of these kinds, 
+                for example ["breach", "death"]. None passes frames regardless of their events.
+            interval: Only pass every interval-th frame of each action phase, starting with the first. 
+                A frame must pass both checks to be handled.
+
+        """
+        if interval < 1:
+            debug_write("Invalid action frame interval {}, it must be at least 1".format(interval))
+            return
+        self.action_frame_events = list(event_kinds) if event_kinds is not None else None
+        self.action_frame_interval = int(interval)
 
     def on_game_start(self, config):
         """
@@ -27,9 +62,11 @@ class AlgoCore(object):
         """
         This step function is called at the start of each turn.
         It is passed the current game state, which can be used to initiate a new GameState object. 
+        The game state is a codec.ParsedMessage: a string that also carries its decoded json, so GameState does not parse it again. 
         By default, it sends empty commands to the game engine. \n
         algo_strategy.py inherits from AlgoCore and overrides this on turn function. 
         Adjusting the on_turn function in algo_strategy is the main way to adjust your algo's logic. 
+        self.turn_budget is started right before this is called, use it to keep searches within the time limit.
         """
         send_command("[]")
         send_command("[]")
@@ -40,10 +77,72 @@ class AlgoCore(object):
         The action phase is made up of a sequence of distinct frames. 
         Each of these frames is sent to the algo in order. 
         They can be handled in this function. 
+        Like on_turn, each frame is a codec.ParsedMessage, use codec.parse to get its decoded json without parsing it again.
         """
         pass
 
 
+    def run_in_background(self, function, *args, **kwargs):
+        """Runs function(cancel_event, *args, **kwargs) on a worker thread while the engine plays out the action phase. 
+
+        Call it at the end of on_turn, after submit_turn. When the next turn message arrives the cancel event is set, 
+        the function gets background_timeout seconds to return its best result so far, and the result is stored in 
+        self.background_result before on_turn is called. Any task still running is cancelled first. 
+        The function runs alongside the main thread, so pass it copies of anything on_turn changes, such as a GameState.clone().
+
+        Args:
+            function: The planning function to run
+            args, kwargs: Passed on to the function after the cancel event
+
+        Returns:
+            The started BackgroundTask
+        """
+        if self.background_task is not None:
+            self.background_task.cancel()
+        self.background_task = BackgroundTask(function, *args, **kwargs).start()
+        return self.background_task
+
+    def start_worker_pool(self, workers=None):
+        """Starts a pool of worker processes for evaluating candidates in parallel, see WorkerPool. 
+
+        Call it in on_game_start, so the time to start the processes is not taken from a turn. 
+        The pool is kept in self.worker_pool and stopped when the game ends.
+
+        Args:
+            workers: The number of worker processes. By default one less than the number of CPUs.
+
+        Returns:
+            The started WorkerPool
+        """
+        if self.worker_pool is not None:
+            self.worker_pool.shutdown()
+        self.worker_pool = WorkerPool(workers)
+        return self.worker_pool
+
+    def _collect_background(self):
+        """Stops the background task, if there is one, and stores its result in background_result
+        """
+        self.background_result = None
+        if self.background_task is not None:
+            self.background_result = self.background_task.collect(self.background_timeout)
+            self.background_task = None
+
+    def _skip_action_frame(self, message):
+        """Checks whether a raw message is an action frame that the action frame filter drops
+        """
+        if self.action_frame_events is None and self.action_frame_interval == 1:
+            return False
+        message_type = codec.message_type(message)
+        if message_type != 1:
+            if message_type == 0:
+                self._action_frame_count = 0
+            return False
+        frame = self._action_frame_count
+        self._action_frame_count += 1
+        if frame % self.action_frame_interval:
+            return True
+        return self.action_frame_events is not None and not codec.has_any_event(message, self.action_frame_events)
+
     def start(self):
         """ 
         Start the parsing loop.
@@ -61,27 +160,50 @@ class AlgoCore(object):
                 """
                 This means this must be the config file. So, load in the config file as a json and add it to your AlgoStrategy class.
                 """
-                parsed_config = json.loads(game_state_string)
+                parsed_config = codec.loads(game_state_string)
+                self.turn_budget = TurnBudget(parsed_config)
                 self.on_game_start(parsed_config)
             elif "turnInfo" in game_state_string:
-                state = json.loads(game_state_string)
+                if self._skip_action_frame(game_state_string):
+                    continue
+                # Decoded once here and handed on with the string, so nothing downstream parses it again
+                game_state_string = codec.decode_message(game_state_string)
+                state = game_state_string.parsed
                 stateType = int(state.get("turnInfo")[0])
                 if stateType == 0:
                     """
                     This is the game turn game state message. Algo must now print to stdout 2 lines, one for build phase one for
                     deploy phase. Printing is handled by the provided functions.
                     """
-                    self.on_turn(game_state_string)
+                    self.turn_budget.start_turn()
+                    self._collect_background()
+                    try:
+                        self.on_turn(game_state_string)
+                    finally:
+                        self.turn_budget.end_turn()
+                        # Buffered log messages are written once per turn, after the turn has been submitted
+                        flush_log()
                 elif stateType == 1:
                     """
                     If stateType == 1, this game_state_string string represents a single frame of an action phase
                     """
-                    self.on_action_frame(game_state_string)
+                    try:
+                        self.on_action_frame(game_state_string)
+                    finally:
+                        flush_log()
                 elif stateType == 2:
                     """
                     This is the end game message. This means the game is over so break and finish the program.
                     """
                     debug_write("Got end state, game over. Stopping algo.")
+                    if self.background_task is not None:
+                        self.background_task.cancel()
+                    if self.worker_pool is not None:
+                        self.worker_pool.shutdown()
+                    stats = self.turn_budget.stats()
+                    debug_write("Turn times: {} turns, mean {:.3f}s, max {:.3f}s, {} over the soft limit".format(
+                        stats["turns"], stats["mean"], stats["max"], stats["over_soft_limit"]))
+                    flush_log()
                     break
                 else:
                     """
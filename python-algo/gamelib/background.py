@@ -0,0 +1,89 @@
+import threading
+
+from .util import debug_write
+
+class BackgroundTask:
+    """Runs a function on a worker thread, for using the time the algo would otherwise spend waiting
+    on the engine during the action phase.
+
+    The function is called as function(cancel_event, *args, **kwargs). It should check cancel_event.is_set()
+    regularly and return its best result so far once it is set. It runs at the same time as the main thread,
+    so it should only use data nothing else changes, for example a GameState.clone().
+
+    Attributes :
+        * cancel_event (threading.Event): Set when the task should stop
+        * result: What the function returned, None until it has returned
+        * error (Exception): The exception the function raised, if any
+
+    """
+    def __init__(self, function, *args, **kwargs):
+        """Prepares the task without starting it
+
+        Args:
+            function: The function to run
+            args, kwargs: Passed on to the function after the cancel event
+
+        """
+        self.cancel_event = threading.Event()
+        self.result = None
+        self.error = None
+        self.__function = function
+        self.__args = args
+        self.__kwargs = kwargs
+        self.__done = threading.Event()
+        # A daemon thread does not keep the algo alive if the function ignores the cancel event
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+
+    def __run(self):
+        try:
+            self.result = self.__function(self.cancel_event, *self.__args, **self.__kwargs)
+        except Exception as error:
+            self.error = error
+            debug_write("Background task raised {}: {}".format(type(error).__name__, error))
+        finally:
+            self.__done.set()
+
+    def start(self):
+        """Starts running the function on its worker thread
+
+        Returns:
+            This task
+        """
+        self.__thread.start()
+        return self
+
+    def cancel(self):
+        """Asks the function to stop, without waiting for it
+        """
+        self.cancel_event.set()
+
+    def done(self):
+        """Checks whether the function has returned or raised
+        """
+        return self.__done.is_set()
+
+    def wait(self, timeout=None):
+        """Waits for the function to return
+
+        Args:
+            timeout: The most seconds to wait, or None to wait for as long as it takes
+
+        Returns:
+            True if the function has returned, False if it is still running
+        """
+        return self.__done.wait(timeout)
+
+    def collect(self, timeout=0.0):
+        """Cancels the task and gets its result
+
+        Args:
+            timeout: The most seconds to wait for the function to return after cancelling it
+
+        Returns:
+            The result of the function, or None if it raised or did not return in time
+        """
+        self.cancel()
+        if not self.wait(timeout):
+            debug_write("Background task did not stop within {} seconds, ignoring it".format(timeout))
+            return None
+        return self.result
@@ -0,0 +1,143 @@
+import time
+
+class TurnBudget:
+    """Keeps track of how much of the engine's time limit the current turn has used.
+
+    The engine allows waitTimeBotSoft milliseconds per turn before it starts penalizing the algo,
+    and ends the game if a turn takes longer than waitTimeBotMax. AlgoCore creates a TurnBudget
+    from the config, starts it right before on_turn and ends it when on_turn returns, so searches
+    in on_turn can check remaining() or use anytime and iterative_deepening to stop in time
+    and submit the best answer found so far.
+
+    Attributes :
+        * soft_limit (float): Seconds a turn may take before the engine penalizes the algo
+        * hard_limit (float): Seconds a turn may take before the engine ends the game
+        * safety_margin (float): Seconds kept free before the soft limit, for submitting the turn and communication
+        * latencies (list): Seconds taken by every finished turn, in order
+
+    """
+    def __init__(self, config=None, safety_margin=0.25, clock=time.perf_counter):
+        """Reads the time limits from config
+
+        Args:
+            config: Contains information about the game. Without one, the engine's default limits are used
+            safety_margin: Seconds to keep free before the soft limit
+            clock: Returns the current time in seconds, only meant to be replaced for testing
+
+        """
+        timing = config.get("timingAndReplay", {}) if config else {}
+        self.soft_limit = timing.get("waitTimeBotSoft", 5000) / 1000
+        self.hard_limit = timing.get("waitTimeBotMax", 35000) / 1000
+        self.safety_margin = safety_margin
+        self.latencies = []
+        self.__clock = clock
+        self.__started = None
+
+    def start_turn(self):
+        """Starts timing a new turn. Called by AlgoCore right before on_turn.
+        """
+        self.__started = self.__clock()
+
+    def end_turn(self):
+        """Stops timing the current turn and records how long it took. Called by AlgoCore when on_turn returns.
+
+        Returns:
+            The seconds the turn took, or None if no turn was being timed
+        """
+        if self.__started is None:
+            return None
+        latency = self.__clock() - self.__started
+        self.__started = None
+        self.latencies.append(latency)
+        return latency
+
+    def elapsed(self):
+        """Gets the seconds spent on the current turn, 0 if no turn is being timed
+        """
+        if self.__started is None:
+            return 0.0
+        return self.__clock() - self.__started
+
+    def remaining(self):
+        """Gets the seconds left before the soft limit, minus the safety margin. Can be negative.
+        """
+        return self.soft_limit - self.safety_margin - self.elapsed()
+
+    def expired(self):
+        """Checks whether the current turn should stop searching and submit
+        """
+        return self.remaining() <= 0
+
+    def anytime(self, candidates, evaluate):
+        """Evaluates candidates in order until they are all done or the time is up, and keeps the best one.
+
+        Put the most promising candidates first. The first candidate is always evaluated,
+        so there is an answer to submit even if the turn is already out of time. After that, a candidate 
+        is only evaluated if the slowest evaluation so far would still finish in time.
+
+        Args:
+            candidates: An iterable of options, for example lists of builds to try
+            evaluate: A function giving a score to a candidate, higher is better
+
+        Returns:
+            (best candidate, its score), or (None, None) if there were no candidates
+        """
+        best = None
+        best_score = None
+        slowest = 0.0
+        for candidate in candidates:
+            started = self.__clock()
+            score = evaluate(candidate)
+            slowest = max(slowest, self.__clock() - started)
+            if best_score is None or score > best_score:
+                best, best_score = candidate, score
+            if self.remaining() < slowest:
+                break
+        return best, best_score
+
+    def iterative_deepening(self, search, max_depth=None, start_depth=1):
+        """Calls search with increasing depths for as long as the next depth is expected to finish in time.
+
+        The time of the next depth is predicted from how much the last depth grew over the one before it,
+        so a search is not started when it would run past the soft limit. A search can also check expired()
+        itself and return early, in which case its result is still kept.
+
+        Args:
+            search: A function taking a depth and returning the best answer found at that depth
+            max_depth: The deepest depth to search, or None to keep going until time runs out
+            start_depth: The first depth to search. It is always searched.
+
+        Returns:
+            (result of the deepest finished search, that depth)
+        """
+        result = None
+        depth = start_depth
+        searched = start_depth - 1
+        previous_duration = None
+        while max_depth is None or depth <= max_depth:
+            started = self.__clock()
+            result = search(depth)
+            duration = self.__clock() - started
+            searched = depth
+            growth = duration / previous_duration if previous_duration else 2.0
+            if self.remaining() < duration * max(growth, 1.0):
+                break
+            previous_duration = duration
+            depth += 1
+        return result, searched
+
+    def stats(self):
+        """Gets statistics about the time taken by finished turns
+
+        Returns:
+            A dict with the number of turns and the mean, max and last turn time in seconds,
+            as well as how many turns went over the soft limit
+        """
+        if not self.latencies:
+            return {"turns": 0, "mean": 0.0, "max": 0.0, "last": 0.0, "over_soft_limit": 0}
+        return {
+            "turns": len(self.latencies),
+            "mean": sum(self.latencies) / len(self.latencies),
+            "max": max(self.latencies),
+            "last": self.latencies[-1],
+            "over_soft_limit": sum(1 for latency in self.latencies if latency > self.soft_limit)}
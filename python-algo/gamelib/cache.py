@@ -0,0 +1,101 @@
+from collections import OrderedDict
+
+class LRUCache:
+    """A dictionary holding at most maxsize entries, which forgets the least recently used entry when it is full.
+
+    It counts how often lookups find what they are looking for, so its size can be tuned with hit_rate.
+    GameMap keeps one of these, game_map.COVERAGE_CACHE, to reuse the coverage of firewall layouts
+    it has already seen, keyed by GameMap.board_hash.
+
+    Attributes :
+        * maxsize (int): The most entries the cache holds
+        * hits (int): The number of lookups that found their key
+        * misses (int): The number of lookups that did not find their key
+        * evictions (int): The number of entries forgotten to make room for new ones
+
+    """
+    def __init__(self, maxsize=128):
+        """Creates an empty cache
+
+        Args:
+            maxsize: The most entries the cache holds, at least 1
+
+        """
+        self.maxsize = max(1, int(maxsize))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, key):
+        return key in self.__entries
+
+    def get(self, key, default=None):
+        """Looks up a key, marking it as the most recently used
+
+        Args:
+            key: The key to look up
+            default: What to return if the key is not in the cache
+
+        Returns:
+            The value stored for key, or default
+        """
+        try:
+            value = self.__entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.__entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Stores a value, forgetting the least recently used entries if the cache is full
+
+        Args:
+            key: The key to store the value under
+            value: The value to store
+
+        """
+        self.__entries[key] = value
+        self.__entries.move_to_end(key)
+        self.__evict()
+
+    def resize(self, maxsize):
+        """Changes the most entries the cache holds, forgetting the least recently used ones if it shrinks
+
+        Args:
+            maxsize: The most entries the cache holds, at least 1
+
+        """
+        self.maxsize = max(1, int(maxsize))
+        self.__evict()
+
+    def clear(self):
+        """Forgets every entry and resets the counters
+        """
+        self.__entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def hit_rate(self):
+        """Gets the share of lookups that found their key
+
+        Returns:
+            A number between 0 and 1, 0 if there have been no lookups
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __evict(self):
+        while len(self.__entries) > self.maxsize:
+            self.__entries.popitem(last=False)
+            self.evictions += 1
+
+    def __repr__(self):
+        return "{}(size={}/{}, hits={}, misses={}, evictions={})".format(
+            type(self).__name__, len(self.__entries), self.maxsize, self.hits, self.misses, self.evictions)
@@ -0,0 +1,188 @@
+import json
+
+from .util import debug_write
+
+# The fastest JSON library that is installed is used for every message to and from the engine.
+# Each library is optional, the standard json module is always available as a fallback.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+try:
+    import rapidjson
+except ImportError:
+    rapidjson = None
+
+ORJSON_BACKEND = "orjson"
+UJSON_BACKEND = "ujson"
+RAPIDJSON_BACKEND = "rapidjson"
+JSON_BACKEND = "json"
+
+def _orjson_dumps(obj):
+    return orjson.dumps(obj).decode("utf-8")
+
+def _json_dumps(obj):
+    # Matches the separators of the other backends, the engine does not need the extra spaces
+    return json.dumps(obj, separators=(",", ":"))
+
+_BACKENDS = {JSON_BACKEND: (json.loads, _json_dumps)}
+if rapidjson is not None:
+    _BACKENDS[RAPIDJSON_BACKEND] = (rapidjson.loads, rapidjson.dumps)
+if ujson is not None:
+    _BACKENDS[UJSON_BACKEND] = (ujson.loads, ujson.dumps)
+if orjson is not None:
+    _BACKENDS[ORJSON_BACKEND] = (orjson.loads, _orjson_dumps)
+
+backend = None
+_loads = None
+_dumps = None
+
+def set_backend(name):
+    """Sets the JSON library used to decode and encode messages
+
+    Args:
+        name: ORJSON_BACKEND, UJSON_BACKEND, RAPIDJSON_BACKEND or JSON_BACKEND. Libraries that are not installed are ignored.
+
+    Returns:
+        True if the backend was changed, False otherwise
+    """
+    global backend, _loads, _dumps
+    if name not in _BACKENDS:
+        debug_write("JSON backend '{}' is not available, using '{}'. Available backends: {}".format(name, backend, ", ".join(_BACKENDS)))
+        return False
+    backend = name
+    _loads, _dumps = _BACKENDS[name]
+    return True
+
+for _name in (ORJSON_BACKEND, UJSON_BACKEND, RAPIDJSON_BACKEND, JSON_BACKEND):
+    if _name in _BACKENDS:
+        set_backend(_name)
+        break
+
+class ParsedMessage(str):
+    """A message from the engine, still usable as the original string, that carries its decoded json.
+
+    AlgoCore decodes every message once and passes it on as a ParsedMessage, so on_turn, on_action_frame
+    and GameState can use the decoded message instead of parsing the same string again.
+    Code that treats it as a plain string, for example calling json.loads on it, keeps working.
+
+    Attributes :
+        * parsed (dict): The decoded message. Shared by everything given this message, so it should not be changed.
+
+    """
+
+def loads(text):
+    """Decodes a json string with the current backend
+
+    Args:
+        text: A json string
+
+    Returns:
+        The decoded object
+    """
+    return _loads(text)
+
+def dumps(obj):
+    """Encodes an object as a compact json string with the current backend
+
+    Args:
+        obj: A json serializable object
+
+    Returns:
+        A json string
+    """
+    return _dumps(obj)
+
+def decode_message(text):
+    """Decodes a message from the engine
+
+    Args:
+        text: A line received from the engine
+
+    Returns:
+        A ParsedMessage holding the line and its decoded json
+    """
+    message = ParsedMessage(text)
+    message.parsed = _loads(text)
+    return message
+
+def parse(message):
+    """Gets the decoded json of a message, only decoding it if that has not already happened
+
+    Args:
+        message: A ParsedMessage, an already decoded dict, or a json string
+
+    Returns:
+        The decoded message
+    """
+    if isinstance(message, dict):
+        return message
+    parsed = getattr(message, "parsed", None)
+    if parsed is not None:
+        return parsed
+    return _loads(message)
+
+def _value_start(text, key):
+    """Gets the position of the first character of the value of "key" in a json string, or -1 if key is not in it
+    """
+    start = text.find('"' + key + '"')
+    if start < 0:
+        return -1
+    position = start + len(key) + 2
+    length = len(text)
+    while position < length and text[position] in " \t\r\n:":
+        position += 1
+    return position
+
+def message_type(text):
+    """Reads turnInfo[0] of an engine message without decoding the rest of it. 
+    0 is the start of a turn, 1 an action frame and 2 the end of the game.
+
+    Args:
+        text: A line received from the engine
+
+    Returns:
+        The message type, or None if it could not be read
+    """
+    position = _value_start(text, "turnInfo")
+    if position < 0 or not text.startswith("[", position):
+        return None
+    position += 1
+    while position < len(text) and text[position] in " \t\r\n":
+        position += 1
+    end = position
+    while end < len(text) and (text[end].isdigit() or text[end] == "-"):
+        end += 1
+    try:
+        return int(text[position:end])
+    except ValueError:
+        return None
+
+def has_any_event(text, event_kinds):
+    """Checks whether an action frame has at least one event of the given kinds, without decoding it. 
+    Event kinds that are missing from the frame count as empty. 
+
+    Args:
+        text: An action frame received from the engine
+        event_kinds: Keys of the frame's events, for example ["breach", "death"]
+
+    Returns:
+        True if any of the event lists is not empty, False otherwise
+    """
+    length = len(text)
+    for kind in event_kinds:
+        position = _value_start(text, kind)
+        if position < 0:
+            continue
+        if not text.startswith("[", position):
+            return True
+        position += 1
+        while position < length and text[position] in " \t\r\n":
+            position += 1
+        if position < length and text[position] != "]":
+            return True
+    return False
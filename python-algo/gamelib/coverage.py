@@ -0,0 +1,109 @@
+from array import array
+
+class CoverageMap:
+    """Holds, for every location, how much damage each player's firewalls can deal there per frame.
+
+    Each firewall's attack range is stamped onto the arrays once when the map is built, and the GameMap 
+    that owns the coverage map adds or removes single firewalls as they change, so lookups never rescan 
+    the area around a location. Arrays are indexed by x * ARENA_SIZE + y, like the per-cell arrays in GameMap, 
+    and are listed by the player index of the firewalls doing the damage.
+
+    Attributes :
+        * game_map (:obj: GameMap): The map whose firewalls are covered
+        * ARENA_SIZE (int): The size of the arena
+        * damage (list): Two arrays, one per player index, holding the total damage per frame that player's firewalls deal to information units at each location
+        * attackers (list): Two arrays, one per player index, holding the number of that player's firewalls that can attack each location
+
+    """
+    def __init__(self, game_map):
+        """Stamps the range of every firewall currently on game_map
+
+        Args:
+            game_map: The GameMap to build the coverage of
+
+        """
+        self.game_map = game_map
+        self.ARENA_SIZE = game_map.ARENA_SIZE
+        cells = self.ARENA_SIZE * self.ARENA_SIZE
+        self.damage = [array('d', [0.0]) * cells, array('d', [0.0]) * cells]
+        self.attackers = [array('i', [0]) * cells, array('i', [0]) * cells]
+        self.__firewall_stats = {}
+
+        stationary_owner = game_map.stationary_owner
+        for index, owner in enumerate(stationary_owner):
+            if owner >= 0:
+                x, y = divmod(index, self.ARENA_SIZE)
+                self.add_firewall(x, y, owner, game_map.stationary_type[index], game_map.stationary_upgraded[index])
+
+    def copy(self, game_map):
+        """Copies the coverage for a clone of its GameMap
+
+        Args:
+            game_map: The GameMap the copy will belong to, which must hold the same firewalls
+
+        Returns:
+            A new CoverageMap with the same values
+        """
+        coverage = CoverageMap.__new__(CoverageMap)
+        coverage.game_map = game_map
+        coverage.ARENA_SIZE = self.ARENA_SIZE
+        coverage.damage = [self.damage[0][:], self.damage[1][:]]
+        coverage.attackers = [self.attackers[0][:], self.attackers[1][:]]
+        coverage.__firewall_stats = self.__firewall_stats
+        return coverage
+
+    def __get_firewall_stats(self, type_index, upgraded):
+        """Gets (damage to information, counts as an attacker, attack range) for a firewall type
+        """
+        key = (type_index, upgraded)
+        stats = self.__firewall_stats.get(key)
+        if stats is None:
+            unit_information = self.game_map.config["unitInformation"][type_index]
+            type_config = dict(unit_information)
+            if upgraded:
+                type_config.update(unit_information.get("upgrade", {}))
+            damage_i = type_config.get("attackDamageWalker", 0)
+            damage_f = type_config.get("attackDamageTower", 0)
+            stats = (damage_i, damage_i + damage_f > 0, type_config.get("attackRange", 0))
+            self.__firewall_stats[key] = stats
+        return stats
+
+    def __stamp(self, x, y, owner, type_index, upgraded, sign):
+        if owner != 0 and owner != 1:
+            return
+        damage_i, attacks, attack_range = self.__get_firewall_stats(type_index, upgraded)
+        if not attacks:
+            return
+        damage = self.damage[owner]
+        attackers = self.attackers[owner]
+        for i, j in self.game_map.get_cached_locations_in_range([x, y], attack_range):
+            index = i * self.ARENA_SIZE + j
+            damage[index] += sign * damage_i
+            attackers[index] += sign
+
+    def add_firewall(self, x, y, owner, type_index, upgraded):
+        """Adds the range of a firewall to the coverage
+
+        Args:
+            x, y: The location of the firewall
+            owner: The player index of the firewall
+            type_index: The index of the firewall's type in config["unitInformation"]
+            upgraded: True if the firewall is upgraded
+
+        """
+        self.__stamp(x, y, owner, type_index, upgraded, 1)
+
+    def remove_firewall(self, x, y, owner, type_index, upgraded):
+        """Removes the range of a firewall from the coverage. Takes the same arguments as add_firewall
+        """
+        self.__stamp(x, y, owner, type_index, upgraded, -1)
+
+    def get_damage(self, location, player_index):
+        """Gets the damage per frame a unit controlled by player_index would take at a location from enemy firewalls
+        """
+        return self.damage[1 - player_index][location[0] * self.ARENA_SIZE + location[1]]
+
+    def get_attacker_count(self, location, player_index):
+        """Gets the number of enemy firewalls that could attack a unit controlled by player_index at a location
+        """
+        return self.attackers[1 - player_index][location[0] * self.ARENA_SIZE + location[1]]
@@ -1,6 +1,150 @@
 import math
+import copy
+import json
+import random
+from array import array
 from .unit import GameUnit
-from .util import debug_write
+from .cache import LRUCache
+from .coverage import CoverageMap
+from .spatial_index import SpatialIndex
+from .util import log, WARNING
+
+ARENA_SIZE = 28
+HALF_ARENA = ARENA_SIZE // 2
+
+def _build_arena_mask():
+    """Builds the diamond shaped board as a ARENA_SIZE x ARENA_SIZE table of booleans, indexed [x][y]
+    """
+    mask = []
+    for x in range(ARENA_SIZE):
+        column = []
+        for y in range(ARENA_SIZE):
+            row_size = y + 1 if y < HALF_ARENA else ARENA_SIZE - y
+            startx = HALF_ARENA - row_size
+            endx = startx + (2 * row_size) - 1
+            column.append(startx <= x <= endx)
+        mask.append(tuple(column))
+    return tuple(mask)
+
+def _build_location_index(locations):
+    """Maps every [x][y] to its position in locations, or -1 if it is off the board
+    """
+    index = [[-1] * ARENA_SIZE for _ in range(ARENA_SIZE)]
+    for position, (x, y) in enumerate(locations):
+        index[x][y] = position
+    return tuple(tuple(column) for column in index)
+
+# Shared, precomputed description of the board. It never changes during a game, so it is built once at import
+# and used by every GameMap and by the pathfinder instead of recomputing the diamond shape arithmetic.
+#   ARENA_MASK[x][y] is True if [x, y] is on the board.
+#   ARENA_LOCATIONS holds the (x, y) locations on the board, ordered by row from the bottom and then by x.
+#   LOCATION_INDEX[x][y] is the position of [x, y] in ARENA_LOCATIONS, or -1 if it is off the board.
+ARENA_MASK = _build_arena_mask()
+ARENA_LOCATIONS = tuple((x, y) for y in range(ARENA_SIZE) for x in range(ARENA_SIZE) if ARENA_MASK[x][y])
+LOCATION_INDEX = _build_location_index(ARENA_LOCATIONS)
+_ARENA_CELL_INDICES = tuple(x * ARENA_SIZE + y for x, y in ARENA_LOCATIONS)
+_HALF_LOCATIONS = (tuple(location for location in ARENA_LOCATIONS if location[1] < HALF_ARENA),
+                   tuple(location for location in ARENA_LOCATIONS if location[1] >= HALF_ARENA))
+
+# Relative offsets covered by each radius, keyed by (radius, get hit radius), and the resulting on-board locations 
+# around each location, keyed by (x, y, radius, get hit radius). The board never changes shape, so both are shared 
+# by every GameMap and kept for the whole game.
+_RANGE_OFFSETS = {}
+_RANGE_CACHE = {}
+
+def _range_offsets(radius, hit_radius):
+    """Gets the (dx, dy) offsets within radius + hit_radius of a location, in the same order get_locations_in_range scans them
+    """
+    key = (radius, hit_radius)
+    offsets = _RANGE_OFFSETS.get(key)
+    if offsets is None:
+        search_radius = math.ceil(radius)
+        offsets = tuple((dx, dy) for dx in range(-search_radius, search_radius + 1)
+                        for dy in range(-search_radius, search_radius + 1)
+                        if math.sqrt(dx**2 + dy**2) < radius + hit_radius)
+        _RANGE_OFFSETS[key] = offsets
+    return offsets
+
+def _config_ranges(config):
+    """Gets every distinct attack, shield and self destruct range used by the units in config, including upgrades
+    """
+    ranges = set()
+    for unit_information in config["unitInformation"]:
+        for stats in (unit_information, unit_information.get("upgrade", {})):
+            for key in ("attackRange", "shieldRange", "selfDestructRange"):
+                if key in stats:
+                    ranges.add(stats[key])
+    return ranges
+
+def _zobrist_table(config):
+    """Gets one random 64 bit key per location, firewall owner, firewall type and upgrade state, for GameMap.board_hash, 
+    followed by one key per location for GameMap.wall_hash. The keys are seeded from the unit information, so every process 
+    playing a game with the same config gets the same keys, and layouts under different configs hash differently. 
+    Indexed by ((cell * 2 + owner) * types + type) * 2 + upgraded, then by cells * 2 * types * 2 + cell.
+    """
+    unit_information = config["unitInformation"]
+    seed = json.dumps(unit_information, sort_keys=True)
+    table = _ZOBRIST_TABLES.get(seed)
+    if table is None:
+        rng = random.Random(seed)
+        cells = ARENA_SIZE * ARENA_SIZE
+        table = [rng.getrandbits(64) for _ in range(cells * 2 * len(unit_information) * 2 + cells)]
+        _ZOBRIST_TABLES[seed] = table
+    return table
+
+_ZOBRIST_TABLES = {}
+
+# The coverage of recently seen firewall layouts, keyed by GameMap.board_hash. Copies are handed out, so entries never change.
+COVERAGE_CACHE = LRUCache(32)
+
+# How much of a location a GameMap owns outright. Clones share their cell lists and units with the map they 
+# were cloned from, and only copy a location's list, or its list and units, before changing them.
+_SHARED = 0
+_OWNS_LIST = 1
+_OWNS_UNITS = 2
+
+def _writes_back(method):
+    """Wraps a list method of _UnitList so the changed list is stored back in its GameMap
+    """
+    def changed(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._game_map[self._location] = list(self)
+        return result
+    changed.__name__ = method.__name__
+    return changed
+
+class _UnitList(list):
+    """The list of units returned by game_map[x, y]. It is a copy of the map's own list, 
+    and every change made to it is stored back with game_map[x, y] = units, so the per-cell arrays, 
+    hashes and caches derived from them stay in sync with changes like game_map[x, y].append(unit).
+    """
+    __slots__ = ("_game_map", "_location")
+
+    def __init__(self, units, game_map, location):
+        list.__init__(self, units)
+        self._game_map = game_map
+        self._location = location
+
+    def __iadd__(self, units):
+        list.__iadd__(self, units)
+        self._game_map[self._location] = list(self)
+        return self
+
+    def __imul__(self, times):
+        list.__imul__(self, times)
+        self._game_map[self._location] = list(self)
+        return self
+
+    append = _writes_back(list.append)
+    extend = _writes_back(list.extend)
+    insert = _writes_back(list.insert)
+    remove = _writes_back(list.remove)
+    pop = _writes_back(list.pop)
+    clear = _writes_back(list.clear)
+    sort = _writes_back(list.sort)
+    reverse = _writes_back(list.reverse)
+    __setitem__ = _writes_back(list.__setitem__)
+    __delitem__ = _writes_back(list.__delitem__)
 
 class GameMap:
     """Holds data about the current game map and provides functions
@@ -9,9 +153,33 @@ class GameMap:
     game_map[x, y] will return a list of Units located at that location, 
     or an empty list if there are no units at the location
 
+    Alongside the unit lists, the map keeps compact per-cell arrays indexed by 
+    x * ARENA_SIZE + y so hot paths can read a single cell instead of walking a list of units. 
+    They are kept in sync by add_unit, remove_unit, upgrade_unit and game_map[x, y] = units, and by changes 
+    to the list returned by game_map[x, y], which is a copy that stores itself back when it is changed. 
+    Changing a GameUnit in that list in place does not update the arrays, use the map's functions for that.
+    A map parsed lazily by GameState fills the arrays straight from the serialized units, and only 
+    creates the GameUnits at a location the first time that location is read or changed.
+
+    Use clone() to get a cheap copy of the map for exploring hypothetical board states, or checkpoint() 
+    and rollback() to try changes on this map and undo them again.
+
+    board_hash identifies the firewall layout: the owner, type and upgrade state of every firewall, but not their health. 
+    It is the exclusive or of one random 64 bit key per firewall, so each change updates it in constant time, and maps 
+    holding the same layout have the same hash however they got there, including clones and rolled back maps. 
+    It can key caches of anything that only depends on the layout, like COVERAGE_CACHE does for get_coverage. 
+    wall_hash is built the same way from only which locations hold a firewall, which is all pathing depends on.
+
     Attributes :
         * config (JSON): Contains information about the current game rules
         * enable_warnings (bool): If true, debug messages for game_map functions will print out
+        * stationary_owner (array): Player index of the firewall on each cell, -1 if there is none
+        * stationary_type (array): Index into config["unitInformation"] of the firewall on each cell, -1 if there is none
+        * stationary_health (array): Health of the firewall on each cell, 0 if there is none
+        * stationary_upgraded (array): 1 if the firewall on each cell is upgraded, 0 otherwise
+        * mobile_count (list): Two arrays, one per player index, holding the number of information units on each cell
+        * board_hash (int): A 64 bit hash of the firewall layout, 0 for an empty map
+        * wall_hash (int): A 64 bit hash of the locations blocked by firewalls, 0 for an empty map
         * ARENA_SIZE (int): The size of the arena.
         * HALF_ARENA (int): Half of the size of the arena.
         * TOP_RIGHT (int): A constant that represents the top right edge
@@ -36,36 +204,68 @@ class GameMap:
         self.BOTTOM_LEFT = 2
         self.BOTTOM_RIGHT = 3
         self.__map = self.__empty_grid()
-        self.__start = [13,0]
+        self.__type_index = {}
+        for index, unit_information in enumerate(self.config["unitInformation"]):
+            self.__type_index[unit_information.get("shorthand")] = index
+        self.__hit_radius = self.config["unitInformation"][0].get('getHitRadius', 0)
+        for radius in _config_ranges(self.config):
+            _range_offsets(radius, self.__hit_radius)
+        self.__coverage = None
+        self.__spatial_index = None
+        self.__zobrist = _zobrist_table(self.config)
+        self.__type_count = len(self.config["unitInformation"])
+        self.__wall_keys = self.ARENA_SIZE * self.ARENA_SIZE * 2 * self.__type_count * 2
+        self.board_hash = 0
+        self.wall_hash = 0
+        self.__pending = {}
+        self.__ownership = bytearray([_OWNS_UNITS]) * (self.ARENA_SIZE * self.ARENA_SIZE)
+        self.__journal = None
+        self.__checkpoint_depth = 0
+        self.__empty_arrays()
     
     def __getitem__(self, location):
         if len(location) == 2 and self.in_arena_bounds(location):
             x,y = location
-            return self.__map[x][y]
+            if self.__pending:
+                self.__materialize(x, y)
+            return _UnitList(self.__map[x][y], self, (x, y))
         self._invalid_coordinates(location)
 
     def __setitem__(self, location, val):
         if type(location) == tuple and len(location) == 2 and self.in_arena_bounds(location):
-            self.__map[location[0]][location[1]] = val
+            self.__set_cell(location[0], location[1], val, _SHARED)
+            self._sync_location(location[0], location[1])
             return
         self._invalid_coordinates(location)
 
     def __iter__(self):
-        self.__start = [13,0]
-        return self
-    
-    def __next__(self):
-        location = self.__start
-        if location == [15,27]:
-            raise StopIteration
-        new_location = [location[0]+1, location[1]]
-        while not self.in_arena_bounds(new_location) and not location == [14,27]:
-            if new_location[0] == self.ARENA_SIZE:
-                new_location = [0, new_location[1]+1]
-            else:
-                new_location = [new_location[0]+1, new_location[1]]
-        self.__start = new_location
-        return location 
+        """Yields every location on the board as [x, y], row by row from the bottom. 
+        Each call starts a new independent iteration, so the map can be iterated in nested loops.
+        """
+        for x, y in ARENA_LOCATIONS:
+            yield [x, y]
+
+    def iter_my_half(self):
+        """Yields every location on your half of the board (y < HALF_ARENA) as [x, y]
+        """
+        for x, y in _HALF_LOCATIONS[0]:
+            yield [x, y]
+
+    def iter_enemy_half(self):
+        """Yields every location on your opponent's half of the board (y >= HALF_ARENA) as [x, y]
+        """
+        for x, y in _HALF_LOCATIONS[1]:
+            yield [x, y]
+
+    def iter_occupied(self):
+        """Yields every location holding at least one unit as [x, y], using the per-cell arrays 
+        so empty locations are skipped without looking at their unit lists.
+        """
+        stationary_owner = self.stationary_owner
+        mobile_0, mobile_1 = self.mobile_count
+        for location, index in zip(ARENA_LOCATIONS, _ARENA_CELL_INDICES):
+            if stationary_owner[index] >= 0 or mobile_0[index] or mobile_1[index]:
+                yield [location[0], location[1]]
 
     def __empty_grid(self):
         grid = []
@@ -75,8 +275,319 @@ class GameMap:
                 grid[x].append([])
         return grid
 
+    def clone(self):
+        """Makes a copy of the map that can be changed without affecting this one.
+
+        The copy shares the config and, until one of the maps changes a location, that location's 
+        list of units and the GameUnits in it, so cloning only copies the per-cell arrays. 
+        Changing a location through add_unit, remove_unit, upgrade_unit or game_map[x, y] = units 
+        copies just that location first.
+
+        Returns:
+            A new GameMap holding the same units as this one
+        """
+        clone = copy.copy(self)
+        clone.__map = [column[:] for column in self.__map]
+        clone.__pending = dict(self.__pending)
+        clone.stationary_owner = self.stationary_owner[:]
+        clone.stationary_type = self.stationary_type[:]
+        clone.stationary_health = self.stationary_health[:]
+        clone.stationary_upgraded = self.stationary_upgraded[:]
+        clone.mobile_count = [self.mobile_count[0][:], self.mobile_count[1][:]]
+        clone.__coverage = self.__coverage.copy(clone) if self.__coverage is not None else None
+        clone.__spatial_index = self.__spatial_index.copy(clone) if self.__spatial_index is not None else None
+        clone.__journal = None
+        clone.__checkpoint_depth = 0
+        # Every location is now shared by both maps
+        self.__ownership = bytearray(len(self.__ownership))
+        clone.__ownership = bytearray(len(self.__ownership))
+        return clone
+
+    def checkpoint(self):
+        """Starts recording changes to the map so they can be undone with rollback.
+
+        Checkpoints nest. Every checkpoint must be ended by exactly one call to rollback or commit, 
+        innermost first. Undoing costs time proportional to the number of locations changed since the checkpoint.
+
+        Returns:
+            A marker to pass to rollback or commit
+        """
+        if self.__journal is None:
+            self.__journal = []
+        self.__checkpoint_depth += 1
+        # Locations are copied before their first change after a checkpoint, so the journal can keep the old lists
+        self.__ownership = bytearray(len(self.__ownership))
+        return len(self.__journal)
+
+    def rollback(self, checkpoint):
+        """Undoes every change made to the map since a checkpoint and ends that checkpoint
+
+        Args:
+            checkpoint: The marker returned by checkpoint
+        """
+        if self.__journal is None:
+            self.warn("Attempted to rollback a GameMap without an active checkpoint")
+            return
+        changed = set()
+        while len(self.__journal) > checkpoint:
+            x, y, cell = self.__journal.pop()
+            self.__map[x][y] = cell
+            self.__ownership[x * self.ARENA_SIZE + y] = _SHARED
+            changed.add((x, y))
+        for x, y in changed:
+            self._sync_location(x, y)
+        self.__end_checkpoint()
+
+    def commit(self, checkpoint):
+        """Keeps the changes made to the map since a checkpoint and ends that checkpoint. 
+        Enclosing checkpoints can still undo them.
+
+        Args:
+            checkpoint: The marker returned by checkpoint
+        """
+        if self.__journal is None:
+            self.warn("Attempted to commit a GameMap without an active checkpoint")
+            return
+        self.__end_checkpoint()
+
+    def __end_checkpoint(self):
+        self.__checkpoint_depth -= 1
+        if self.__checkpoint_depth == 0:
+            self.__journal = None
+
+    def __set_cell(self, x, y, cell, ownership):
+        """Replaces the list of units at a location, recording the old list if a checkpoint needs it
+        """
+        if self.__pending:
+            self.__materialize(x, y)
+        index = x * self.ARENA_SIZE + y
+        if self.__journal is not None and self.__ownership[index] == _SHARED:
+            self.__journal.append((x, y, self.__map[x][y]))
+        self.__map[x][y] = cell
+        self.__ownership[index] = ownership
+
+    def __own_list(self, x, y):
+        """Makes sure this map is the only one holding the list of units at a location, so it can be changed in place
+        """
+        if self.__pending:
+            self.__materialize(x, y)
+        if self.__ownership[x * self.ARENA_SIZE + y] == _SHARED:
+            self.__set_cell(x, y, list(self.__map[x][y]), _OWNS_LIST)
+
+    def __own_units(self, x, y):
+        """Makes sure this map is the only one holding the list of units at a location and the units in it, 
+        so the units can be changed in place
+        """
+        if self.__pending:
+            self.__materialize(x, y)
+        if self.__ownership[x * self.ARENA_SIZE + y] != _OWNS_UNITS:
+            self.__set_cell(x, y, [copy.copy(unit) for unit in self.__map[x][y]], _OWNS_UNITS)
+
+    def __empty_arrays(self):
+        cells = self.ARENA_SIZE * self.ARENA_SIZE
+        self.stationary_owner = array('b', [-1]) * cells
+        self.stationary_type = array('b', [-1]) * cells
+        self.stationary_health = array('d', [0.0]) * cells
+        self.stationary_upgraded = array('b', [0]) * cells
+        self.mobile_count = [array('i', [0]) * cells, array('i', [0]) * cells]
+
+    def _sync_location(self, x, y):
+        """Recomputes the per-cell arrays of a location from its list of units
+        """
+        if self.__pending:
+            self.__materialize(x, y)
+        index = x * self.ARENA_SIZE + y
+        old_owner = self.stationary_owner[index]
+        old_type_index = self.stationary_type[index]
+        old_upgraded = self.stationary_upgraded[index]
+        owner = -1
+        type_index = -1
+        health = 0.0
+        upgraded = 0
+        counts = [0, 0]
+        for unit in self.__map[x][y]:
+            if unit.stationary:
+                owner = unit.player_index
+                type_index = self.__type_index[unit.unit_type]
+                health = unit.health
+                upgraded = 1 if unit.upgraded else 0
+            elif unit.player_index == 0 or unit.player_index == 1:
+                counts[unit.player_index] += 1
+        self.stationary_owner[index] = owner
+        self.stationary_type[index] = type_index
+        self.stationary_health[index] = health
+        self.stationary_upgraded[index] = upgraded
+        self.mobile_count[0][index] = counts[0]
+        self.mobile_count[1][index] = counts[1]
+        if owner != old_owner or type_index != old_type_index or upgraded != old_upgraded:
+            self._stationary_changed(x, y, old_owner, old_type_index, old_upgraded)
+
+    def _stationary_changed(self, x, y, old_owner, old_type_index, old_upgraded):
+        """Called whenever the firewall at a location is added, removed, replaced or upgraded, 
+        after the per-cell arrays hold the new firewall. Updates everything derived from the firewall layout.
+        """
+        index = x * self.ARENA_SIZE + y
+        if old_owner >= 0:
+            self.board_hash ^= self.__zobrist_key(index, old_owner, old_type_index, old_upgraded)
+        if self.stationary_owner[index] >= 0:
+            self.board_hash ^= self.__zobrist_key(index, self.stationary_owner[index], self.stationary_type[index], self.stationary_upgraded[index])
+        if (old_owner >= 0) != (self.stationary_owner[index] >= 0):
+            self.wall_hash ^= self.__zobrist[self.__wall_keys + index]
+        for derived in (self.__coverage, self.__spatial_index):
+            if derived is None:
+                continue
+            if old_owner >= 0:
+                derived.remove_firewall(x, y, old_owner, old_type_index, old_upgraded)
+            if self.stationary_owner[index] >= 0:
+                derived.add_firewall(x, y, self.stationary_owner[index], self.stationary_type[index], self.stationary_upgraded[index])
+
+    def __zobrist_key(self, index, owner, type_index, upgraded):
+        """Gets the key of a firewall in board_hash
+        """
+        if owner != 0 and owner != 1:
+            return 0
+        return self.__zobrist[((index * 2 + owner) * self.__type_count + type_index) * 2 + (1 if upgraded else 0)]
+
+    def get_coverage(self):
+        """Gets the damage coverage of the firewalls on this map. 
+
+        It is built the first time it is requested, then kept up to date as firewalls are added, removed or upgraded. 
+        If a map with the same board_hash built its coverage recently, that coverage is copied from COVERAGE_CACHE instead.
+
+        Returns:
+            A CoverageMap for this map
+        """
+        if self.__coverage is None:
+            cached = COVERAGE_CACHE.get(self.board_hash)
+            if cached is None:
+                self.__coverage = CoverageMap(self)
+                COVERAGE_CACHE.put(self.board_hash, self.__coverage.copy(None))
+            else:
+                self.__coverage = cached.copy(self)
+        return self.__coverage
+
+    def get_spatial_index(self):
+        """Gets the index of where each player's firewalls of each type are on this map. 
+
+        It is built the first time it is requested, then kept up to date as firewalls are added, removed or replaced.
+
+        Returns:
+            A SpatialIndex for this map
+        """
+        if self.__spatial_index is None:
+            self.__spatial_index = SpatialIndex(self)
+        return self.__spatial_index
+
+    def _place_unit(self, unit):
+        """Appends an existing GameUnit to the list at its own location and updates the per-cell arrays.
+        Used by GameState when parsing the serialized game state.
+        """
+        x, y = unit.x, unit.y
+        self.__own_list(x, y)
+        self.__map[x][y].append(unit)
+        if unit.stationary:
+            self._sync_location(x, y)
+        elif unit.player_index == 0 or unit.player_index == 1:
+            self.mobile_count[unit.player_index][x * self.ARENA_SIZE + y] += 1
+
+    def _defer_units(self, units, player_index, remove_type, upgrade_type):
+        """Fills the per-cell arrays straight from one player's serialized unit lists, without creating GameUnits. 
+        The units are kept as records and only become GameUnits when their location is first read or changed. 
+        Used by GameState when parsing the serialized game state lazily, on a map that has no units yet.
+
+        Args:
+            units: The p1Units or p2Units list of the serialized game state, one list of [x, y, health, id] per unit type
+            player_index: The index of the player owning the units
+            remove_type: The shorthand of the removal marker
+            upgrade_type: The shorthand of the upgrade marker
+        """
+        unit_information = self.config["unitInformation"]
+        pending = self.__pending
+        for type_index, unit_list in enumerate(units):
+            unit_type = unit_information[type_index].get("shorthand")
+            marker = unit_type == remove_type or unit_type == upgrade_type
+            stationary = unit_information[type_index].get("unitCategory") == 0
+            for uinfo in unit_list:
+                x, y = int(uinfo[0]), int(uinfo[1])
+                index = x * self.ARENA_SIZE + y
+                # This depends on RM and UP always being the last types to be processed, as in GameState
+                if marker:
+                    if self.stationary_owner[index] >= 0:
+                        record = pending[index][0]
+                        if unit_type == remove_type:
+                            record[3] = True
+                        else:
+                            for record in pending[index]:
+                                if unit_information[self.__type_index[record[0]]].get("unitCategory") == 0:
+                                    record[4] = True
+                                    break
+                            if not self.stationary_upgraded[index]:
+                                self.board_hash ^= self.__zobrist_key(index, self.stationary_owner[index], self.stationary_type[index], 0)
+                                self.board_hash ^= self.__zobrist_key(index, self.stationary_owner[index], self.stationary_type[index], 1)
+                            self.stationary_upgraded[index] = 1
+                    continue
+                # GameUnit treats a health of 0 as full health
+                health = float(uinfo[2]) or float(unit_information[type_index].get("startHealth", 0))
+                pending.setdefault(index, []).append([unit_type, player_index, health, False, False])
+                if stationary:
+                    if self.stationary_owner[index] >= 0:
+                        self.board_hash ^= self.__zobrist_key(index, self.stationary_owner[index], self.stationary_type[index], self.stationary_upgraded[index])
+                    else:
+                        self.wall_hash ^= self.__zobrist[self.__wall_keys + index]
+                    self.board_hash ^= self.__zobrist_key(index, player_index, type_index, 0)
+                    self.stationary_owner[index] = player_index
+                    self.stationary_type[index] = type_index
+                    self.stationary_health[index] = health
+                    self.stationary_upgraded[index] = 0
+                elif player_index == 0 or player_index == 1:
+                    self.mobile_count[player_index][index] += 1
+
+    def __materialize(self, x, y):
+        """Creates the GameUnits deferred by _defer_units at a location, if there are any
+        """
+        records = self.__pending.pop(x * self.ARENA_SIZE + y, None)
+        if records is None:
+            return
+        cell = []
+        for unit_type, player_index, health, pending_removal, upgraded in records:
+            unit = GameUnit(unit_type, self.config, player_index, health, x, y)
+            if upgraded:
+                unit.upgrade()
+            unit.pending_removal = pending_removal
+            cell.append(unit)
+        self.__map[x][y] = cell
+
+    def _take_unit(self, unit):
+        """Removes one GameUnit from the list at its own location and updates the per-cell arrays. 
+        Used by the simulator to move units and remove the ones that died.
+
+        Returns:
+            True if the unit was on the map, False otherwise
+        """
+        x, y = unit.x, unit.y
+        self.__own_list(x, y)
+        cell = self.__map[x][y]
+        for position, other in enumerate(cell):
+            if other is unit:
+                del cell[position]
+                break
+        else:
+            return False
+        if unit.stationary:
+            self._sync_location(x, y)
+        elif unit.player_index == 0 or unit.player_index == 1:
+            self.mobile_count[unit.player_index][x * self.ARENA_SIZE + y] -= 1
+        return True
+
+    def _owned_units(self, x, y):
+        """Gets the list of units at a location, copying the list and units first if they are shared with another map, 
+        so the units can be changed in place. Call _sync_location after changing a firewall.
+        """
+        self.__own_units(x, y)
+        return self.__map[x][y]
+
     def _invalid_coordinates(self, location):
-        self.warn("{} is out of bounds.".format(str(location)))
+        self.warn("{} is out of bounds.", location)
 
     def in_arena_bounds(self, location):
         """Checks if the given location is inside the diamond shaped game board.
@@ -89,19 +600,12 @@ class GameMap:
         
         """
         x, y = location
-        half_board = self.HALF_ARENA
-
-        row_size = y + 1
-        startx = half_board - row_size
-        endx = startx + (2 * row_size) - 1
-        top_half_check = (y < self.HALF_ARENA and x >= startx and x <= endx)
-
-        row_size = (self.ARENA_SIZE - 1 - y) + 1
-        startx = half_board - row_size
-        endx = startx + (2 * row_size) - 1
-        bottom_half_check = (y >= self.HALF_ARENA and x >= startx and x <= endx)
-
-        return bottom_half_check or top_half_check
+        if type(x) is int and type(y) is int:
+            return 0 <= x < ARENA_SIZE and 0 <= y < ARENA_SIZE and ARENA_MASK[x][y]
+        # Other coordinates, such as floats, get the exact diamond test rather than a truncated table lookup
+        row_size = y + 1 if y < HALF_ARENA else ARENA_SIZE - y
+        startx = HALF_ARENA - row_size
+        return startx <= x <= startx + 2 * row_size - 1
 
     def get_edge_locations(self, quadrant_description):
         """Takes in an edge description and returns a list of locations.
@@ -114,7 +618,7 @@ class GameMap:
 
         """
         if not quadrant_description in [self.TOP_LEFT, self.TOP_RIGHT, self.BOTTOM_LEFT, self.BOTTOM_RIGHT]:
-            self.warn("Passed invalid quadrant_description '{}'. See the documentation for valid inputs for get_edge_locations.".format(quadrant_description))
+            self.warn("Passed invalid quadrant_description '{}'. See the documentation for valid inputs for get_edge_locations.", quadrant_description)
             return
 
         edges = self.get_edges()
@@ -164,14 +668,16 @@ class GameMap:
         if not self.in_arena_bounds(location):
             self._invalid_coordinates(location)
         if player_index < 0 or player_index > 1:
-            self.warn("Player index {} is invalid. Player index should be 0 or 1.".format(player_index))
+            self.warn("Player index {} is invalid. Player index should be 0 or 1.", player_index)
 
         x, y = location
         new_unit = GameUnit(unit_type, self.config, player_index, None, location[0], location[1])
         if not new_unit.stationary:
+            self.__own_list(x, y)
             self.__map[x][y].append(new_unit)
         else:
-            self.__map[x][y] = [new_unit]
+            self.__set_cell(x, y, [new_unit], _OWNS_UNITS)
+        self._sync_location(x, y)
 
     def remove_unit(self, location):
         """Remove all units on the map in the given location.
@@ -186,7 +692,32 @@ class GameMap:
             self._invalid_coordinates(location)
         
         x, y = location
-        self.__map[x][y] = []
+        self.__set_cell(x, y, [], _OWNS_UNITS)
+        self._sync_location(x, y)
+
+    def upgrade_unit(self, location):
+        """Upgrade the stationary unit on the map at the given location.
+
+        Args:
+            location: The location of the firewall to upgrade
+
+        Returns:
+            The upgraded GameUnit, or None if there is no firewall at the location
+
+        Like add_unit, this function only changes the data stored in GameMap and does not affect your turn. 
+        Use GameState.attempt_upgrade to upgrade your own firewalls.
+        """
+        if not self.in_arena_bounds(location):
+            self._invalid_coordinates(location)
+            return
+
+        x, y = location
+        self.__own_units(x, y)
+        for unit in self.__map[x][y]:
+            if unit.stationary:
+                unit.upgrade()
+                self._sync_location(x, y)
+                return unit
 
     def get_locations_in_range(self, location, radius):
         """Gets locations in a circular area around a location
@@ -200,21 +731,57 @@ class GameMap:
 
         """
         if radius < 0 or radius > self.ARENA_SIZE:
-            self.warn("Radius {} was passed to get_locations_in_range. Expected integer between 0 and {}".format(radius, self.ARENA_SIZE))
+            self.warn("Radius {} was passed to get_locations_in_range. Expected integer between 0 and {}", radius, self.ARENA_SIZE)
         if not self.in_arena_bounds(location):
             self._invalid_coordinates(location)
 
+        return [[x, y] for x, y in self.get_cached_locations_in_range(location, radius)]
+
+    def get_cached_locations_in_range(self, location, radius):
+        """Gets locations in a circular area around a location, as a shared tuple of (x, y) tuples
+
+        Results are memoized per location and radius for the whole game, so this is much faster than 
+        get_locations_in_range when called repeatedly. The returned tuple is shared and must not be modified.
+
+        Args:
+            location: The center of our search area
+            radius: The radius of our search area
+
+        Returns:
+            The locations that are within our search area
+
+        """
+        x, y = location
+        key = (x, y, radius, self.__hit_radius)
+        locations = _RANGE_CACHE.get(key)
+        if locations is not None:
+            return locations
+
+        if x != int(x) or y != int(y):
+            return self.__scan_locations_in_range(location, radius)
+        x, y = int(x), int(y)
+        locations = []
+        for dx, dy in _range_offsets(radius, self.__hit_radius):
+            i, j = x + dx, y + dy
+            if 0 <= i < ARENA_SIZE and 0 <= j < ARENA_SIZE and ARENA_MASK[i][j]:
+                locations.append((i, j))
+        locations = tuple(locations)
+        if self.in_arena_bounds(location):
+            _RANGE_CACHE[key] = locations
+        return locations
+
+    def __scan_locations_in_range(self, location, radius):
+        """Checks every location in the square around a location. Only used for locations that are not on the grid
+        """
         x, y = location
         locations = []
         search_radius = math.ceil(radius)
-        getHitRadius = self.config["unitInformation"][0]['getHitRadius']
-        for i in range(int(x - search_radius), int(x + search_radius + 1)):
-            for j in range(int(y - search_radius), int(y + search_radius + 1)):
-                new_location = [i, j]
+        for i in range(max(int(x - search_radius), 0), min(int(x + search_radius + 1), ARENA_SIZE)):
+            for j in range(max(int(y - search_radius), 0), min(int(y + search_radius + 1), ARENA_SIZE)):
                 # A unit with a given range affects all locations who's centers are within that range + get hit radius
-                if self.in_arena_bounds(new_location) and self.distance_between_locations(location, new_location) < radius + getHitRadius:
-                    locations.append(new_location)
-        return locations
+                if ARENA_MASK[i][j] and self.distance_between_locations(location, [i, j]) < radius + self.__hit_radius:
+                    locations.append((i, j))
+        return tuple(locations)
 
     def distance_between_locations(self, location_1, location_2):
         """Euclidean distance
@@ -232,9 +799,10 @@ class GameMap:
 
         return math.sqrt((x1 - x2)**2 + (y1 - y2)**2)
 
-    def warn(self, message):
+    def warn(self, message, *args):
         """
-        Used internally by game_map to print out default messaging
+        Used internally by game_map to print out default messaging. 
+        The message is only formatted with args if it is printed.
         """
         if(self.enable_warnings):
-            debug_write(message)
+            log(WARNING, message, *args)
@@ -1,11 +1,21 @@
 import math
-import json
 import sys
+import copy
+from contextlib import contextmanager
 
-from .navigation import ShortestPathFinder
-from .util import send_command, debug_write
-from .unit import GameUnit
-from .game_map import GameMap
+from .navigation import ShortestPathFinder, PATH_CACHE
+from .util import send_command, log, WARNING
+from .unit import GameUnit, get_unit_stats
+from .game_map import GameMap, ARENA_LOCATIONS
+from . import codec
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# The cell index of every location on the board ordered by x, then y, which is the order get_target looks at locations in
+_CELLS_BY_X = tuple(x * 28 + y for x, y in sorted(ARENA_LOCATIONS))
 
 def is_stationary(unit_type):
     """
@@ -17,6 +27,26 @@ def is_stationary(unit_type):
     """
     return unit_type in FIREWALL_TYPES
 
+class PathScore:
+    """How much damage a unit would take following a path, see GameState.score_paths
+
+    Attributes :
+        * damage (float): The total damage the unit would take along the path
+        * cumulative (list): The damage taken by the time the unit leaves each location of the path
+        * frames_in_range (int): The number of frames the unit would spend in range of enemy firewalls
+        * death_index (int): The index in the path of the location where the unit would die, or None if it survives
+
+    """
+    def __init__(self, damage, cumulative, frames_in_range, death_index):
+        self.damage = damage
+        self.cumulative = cumulative
+        self.frames_in_range = frames_in_range
+        self.death_index = death_index
+
+    def __repr__(self):
+        return "PathScore(damage={}, frames_in_range={}, death_index={})".format(self.damage, self.frames_in_range, self.death_index)
+
+
 class GameState:
     """Represents the entire gamestate for a given turn
     Provides methods related to resources and unit deployment
@@ -45,12 +75,16 @@ class GameState:
 
     """
 
-    def __init__(self, config, serialized_string):
+    def __init__(self, config, serialized_string, lazy=False):
         """ Setup a turns variables using arguments passed
 
         Args:
             * config (JSON): A json object containing information about the game
-            * serialized_string (string): A string containing information about the game state at the start of this turn
+            * serialized_string (string): A string containing information about the game state at the start of this turn. 
+              The ParsedMessage passed to on_turn and an already decoded dict are also accepted, and are not parsed again.
+            * lazy (bool): If true, only resources, health, time and turn_number are parsed up front. The units are put on 
+              game_map the first time it is used, filling its per-cell arrays directly and creating each location's 
+              GameUnits only when that location is read or changed.
 
         """
         self.serialized_string = serialized_string
@@ -87,7 +121,9 @@ class GameState:
         BITS = self.BITS
         CORES = self.CORES
 
-        self.game_map = GameMap(self.config)
+        self._game_map = None
+        self.__lazy = lazy
+        self.__serialized_units = None
         self._shortest_path_finder = ShortestPathFinder()
         self._build_stack = []
         self._deploy_stack = []
@@ -99,9 +135,9 @@ class GameState:
     def __parse_state(self, state_line):
         """
         Fills in map based on the serialized game state so that self.game_map[x,y] is a list of GameUnits at that location.
-        state_line is the game state as a json string.
+        state_line is the game state as a json string, a codec.ParsedMessage or a decoded dict.
         """
-        state = json.loads(state_line)
+        state = codec.parse(state_line)
 
         turn_info = state["turnInfo"]
         self.turn_number = int(turn_info[1])
@@ -121,9 +157,30 @@ class GameState:
         p1units = state["p1Units"]
         p2units = state["p2Units"]
 
+        if self.__lazy:
+            self.__serialized_units = (p1units, p2units)
+            return
+        self._game_map = GameMap(self.config)
         self.__create_parsed_units(p1units, 0)
         self.__create_parsed_units(p2units, 1)
 
+    @property
+    def game_map(self):
+        if self._game_map is None:
+            # Lazily parsed, so this is the first time the map is used
+            game_map = GameMap(self.config)
+            game_map.enable_warnings = self.enable_warnings
+            p1units, p2units = self.__serialized_units
+            game_map._defer_units(p1units, 0, REMOVE, UPGRADE)
+            game_map._defer_units(p2units, 1, REMOVE, UPGRADE)
+            self.__serialized_units = None
+            self._game_map = game_map
+        return self._game_map
+
+    @game_map.setter
+    def game_map(self, game_map):
+        self._game_map = game_map
+
     def __create_parsed_units(self, units, player_number):
         """
         Helper function for __parse_state to add units to the map.
@@ -142,10 +199,10 @@ class GameState:
                         self.game_map[x,y][0].pending_removal = True
                 elif unit_type == UPGRADE:
                     if self.contains_stationary_unit([x,y]):
-                        self.game_map[x,y][0].upgrade()
+                        self.game_map.upgrade_unit([x,y])
                 else:
                     unit = GameUnit(unit_type, self.config, player_number, hp, x, y)
-                    self.game_map[x,y].append(unit)
+                    self.game_map._place_unit(unit)
 
     def __resource_required(self, unit_type):
         return self.CORES if is_stationary(unit_type) else self.BITS
@@ -160,20 +217,90 @@ class GameState:
         elif resource_type == self.CORES:
             resource_key = 'cores'
         held_resource = self.get_resource(resource_type, player_index)
-        self._player_resources[player_index][resource_key] = held_resource + amount
+        # Resource entries are replaced rather than changed in place, since clones share them
+        resources = dict(self._player_resources[player_index])
+        resources[resource_key] = held_resource + amount
+        self._player_resources[player_index] = resources
+
+    def clone(self):
+        """Makes a copy of this game state that can be changed without affecting this one, 
+        for exploring hypothetical builds and deploys.
+
+        The copy shares the config and, through GameMap.clone, the unit lists and GameUnits of every 
+        location until one of the states changes that location. Resources, queued builds and deploys 
+        and pathfinding results are carried over, and nothing is re-parsed.
+
+        Returns:
+            A new GameState in the same state as this one
+        """
+        clone = copy.copy(self)
+        clone.game_map = self.game_map.clone()
+        clone._shortest_path_finder = self._shortest_path_finder.clone()
+        clone._build_stack = list(self._build_stack)
+        clone._deploy_stack = list(self._deploy_stack)
+        clone._player_resources = list(self._player_resources)
+        return clone
+
+    def checkpoint(self):
+        """Starts recording changes made by attempt_spawn, attempt_upgrade, attempt_remove and the 
+        GameMap functions, so they can be undone with rollback. Useful for evaluating many hypothetical 
+        builds on one game state without cloning it.
+
+        Checkpoints nest. Every checkpoint must be ended by exactly one call to rollback or commit, innermost first.
+
+        Returns:
+            A marker to pass to rollback or commit
+        """
+        return (self.game_map.checkpoint(), list(self._player_resources), len(self._build_stack), len(self._deploy_stack))
+
+    def rollback(self, checkpoint):
+        """Undoes every change to resources, the map and the queued builds and deploys since a checkpoint, 
+        and ends that checkpoint. Takes time proportional to the number of changes.
+
+        Args:
+            checkpoint: The marker returned by checkpoint
+        """
+        map_checkpoint, player_resources, build_length, deploy_length = checkpoint
+        self.game_map.rollback(map_checkpoint)
+        self._player_resources = player_resources
+        del self._build_stack[build_length:]
+        del self._deploy_stack[deploy_length:]
+
+    def commit(self, checkpoint):
+        """Keeps every change made since a checkpoint and ends that checkpoint. Enclosing checkpoints can still undo them.
+
+        Args:
+            checkpoint: The marker returned by checkpoint
+        """
+        self.game_map.commit(checkpoint[0])
+
+    @contextmanager
+    def trial(self):
+        """A with block whose changes to the game state are always undone when it ends, for example
+
+            with game_state.trial():
+                game_state.attempt_spawn(DESTRUCTOR, [13, 11])
+                damage = game_state.get_path_damage(game_state.find_path_to_edge([13, 0]))
+
+        """
+        checkpoint = self.checkpoint()
+        try:
+            yield self
+        finally:
+            self.rollback(checkpoint)
 
     def _invalid_player_index(self, index):
-        self.warn("Invalid player index {} passed, player index should always be 0 (yourself) or 1 (your opponent)".format(index))
+        self.warn("Invalid player index {} passed, player index should always be 0 (yourself) or 1 (your opponent)", index)
     
     def _invalid_unit(self, unit):
-        self.warn("Invalid unit {}".format(unit))
+        self.warn("Invalid unit {}", unit)
 
     def submit_turn(self):
         """Submit and end your turn.
             Must be called at the end of your turn or the algo will hang.
         """
-        build_string = json.dumps(self._build_stack)
-        deploy_string = json.dumps(self._deploy_stack)
+        build_string = codec.dumps(self._build_stack)
+        deploy_string = codec.dumps(self._deploy_stack)
         send_command(build_string)
         send_command(deploy_string)
 
@@ -192,7 +319,7 @@ class GameState:
             self._invalid_player_index(player_index)
             return
         if not resource_type == self.BITS and not resource_type == self.CORES:
-            self.warn("Invalid resource_type '{}'. Please use BITS (0) or CORES (1)".format(resource_type))
+            self.warn("Invalid resource_type '{}'. Please use BITS (0) or CORES (1)", resource_type)
             return
 
         if resource_type == self.BITS:
@@ -262,11 +389,11 @@ class GameState:
         """
 
         if turns_in_future < 1 or turns_in_future > 99:
-            self.warn("Invalid turns in future used ({}). Turns in future should be between 1 and 99".format(turns_in_future))
+            self.warn("Invalid turns in future used ({}). Turns in future should be between 1 and 99", turns_in_future)
         if not player_index == 1 and not player_index == 0:
             self._invalid_player_index(player_index)
         if type(current_bits) == int and current_bits < 0:
-            self.warn("Invalid current bits ({}). Current bits cannot be negative.".format(current_bits))
+            self.warn("Invalid current bits ({}). Current bits cannot be negative.", current_bits)
 
         bits = self.get_resource(self.BITS, player_index) if not current_bits else current_bits
         for increment in range(1, turns_in_future + 1):
@@ -321,7 +448,7 @@ class GameState:
         
         if not self.game_map.in_arena_bounds(location):
             if self.enable_warnings:
-                self.warn("Could not spawn {} at location {}. Location invalid.".format(unit_type, location))
+                self.warn("Could not spawn {} at location {}. Location invalid.", unit_type, location)
             return False
 
         affordable = self.number_affordable(unit_type) >= num
@@ -341,7 +468,7 @@ class GameState:
             if not (stationary or on_edge):
                 fail_reason = fail_reason + " Information units must be deployed on the edge."
             if len(fail_reason) > 0:
-                self.warn("Could not spawn {} at location {}.{}".format(unit_type, location, fail_reason))
+                self.warn("Could not spawn {} at location {}.{}", unit_type, location, fail_reason)
 
         return (affordable and correct_territory and not blocked and
                 (stationary or on_edge) and
@@ -363,7 +490,7 @@ class GameState:
             self._invalid_unit(unit_type)
             return
         if num < 1:
-            self.warn("Attempted to spawn fewer than one units! ({})".format(num))
+            self.warn("Attempted to spawn fewer than one units! ({})", num)
             return
       
         if type(locations[0]) == int:
@@ -405,7 +532,7 @@ class GameState:
                 self._build_stack.append((REMOVE, x, y))
                 removed_units += 1
             else:
-                self.warn("Could not remove a unit from {}. Location has no firewall or is enemy territory.".format(location))
+                self.warn("Could not remove a unit from {}. Location has no firewall or is enemy territory.", location)
         return removed_units
 
     def attempt_upgrade(self, locations):
@@ -436,11 +563,11 @@ class GameState:
                     if resources[CORES] >= costs[CORES] and resources[BITS] >= costs[BITS]:
                         self.__set_resource(CORES, 0 - costs[CORES])
                         self.__set_resource(BITS, 0 - costs[BITS])
-                        existing_unit.upgrade()
+                        self.game_map.upgrade_unit([x, y])
                         self._build_stack.append((UPGRADE, x, y))
                         spawned_units += 1
             else:
-                self.warn("Could not upgrade a unit from {}. Location has no firewall or is enemy territory.".format(location))
+                self.warn("Could not upgrade a unit from {}. Location has no firewall or is enemy territory.", location)
         return spawned_units
 
     def get_target_edge(self, start_location):
@@ -466,12 +593,16 @@ class GameState:
         elif right and top:
             return self.game_map.BOTTOM_LEFT
 
-    def find_path_to_edge(self, start_location, target_edge=None):
+    def find_path_to_edge(self, start_location, target_edge=None, use_cache=True):
         """Gets the path a unit at a given location would take
 
+        Paths are remembered in navigation.PATH_CACHE, keyed by the walls on the map, so asking again for 
+        a path on walls seen before, this turn or an earlier one, does not search again.
+
         Args:
             start_location: The location of a hypothetical unit
             target_edge: The edge the unit wants to reach. game_map.TOP_LEFT, game_map.BOTTOM_RIGHT, etc. Induced from start_location if None.
+            use_cache: Look the path up in, and add it to, navigation.PATH_CACHE
 
         Returns:
             A list of locations corresponding to the path the unit would take 
@@ -479,14 +610,43 @@ class GameState:
 
         """
         if self.contains_stationary_unit(start_location):
-            self.warn("Attempted to perform pathing from blocked starting location {}".format(start_location))
+            self.warn("Attempted to perform pathing from blocked starting location {}", start_location)
             return
 
         if target_edge is None:
             target_edge = self.get_target_edge(start_location)
 
+        wall_hash = self.game_map.wall_hash
+        if use_cache:
+            path = PATH_CACHE.get_path(wall_hash, start_location, target_edge)
+            if path is not None:
+                return path
         end_points = self.game_map.get_edge_locations(target_edge)
-        return self._shortest_path_finder.navigate_multiple_endpoints(start_location, end_points, self)
+        path = self._shortest_path_finder.navigate_multiple_endpoints(start_location, end_points, self)
+        if use_cache and path is not None:
+            PATH_CACHE.put_path(wall_hash, start_location, target_edge, path)
+        return path
+
+    def find_paths_from_all_edges(self):
+        """Gets the path a unit would take from every location on your edges that you can deploy to
+
+        Each location on game_map.BOTTOM_LEFT heads for game_map.TOP_RIGHT and each location on 
+        game_map.BOTTOM_RIGHT heads for game_map.TOP_LEFT, just like find_path_to_edge. 
+        All of the paths are computed in one pass that shares the pathfinding work between them.
+
+        Returns:
+            A list of paths, one for each edge location not blocked by a firewall, bottom left edge first. 
+            The first location of each path is the location the unit was deployed at.
+
+        """
+        paths = []
+        for start_edge, target_edge in ((self.game_map.BOTTOM_LEFT, self.game_map.TOP_RIGHT), (self.game_map.BOTTOM_RIGHT, self.game_map.TOP_LEFT)):
+            start_points = self.game_map.get_edge_locations(start_edge)
+            end_points = self.game_map.get_edge_locations(target_edge)
+            for path in self._shortest_path_finder.navigate_multiple_starts(start_points, end_points, self):
+                if path is not None:
+                    paths.append(path)
+        return paths
 
     def contains_stationary_unit(self, location):
         """Check if a location is blocked
@@ -502,17 +662,20 @@ class GameState:
             self.warn('Checked for stationary unit outside of arena bounds')
             return False
         x, y = map(int, location)
+        if self.game_map.stationary_owner[x * self.ARENA_SIZE + y] < 0:
+            return False
         for unit in self.game_map[x,y]:
             if unit.stationary:
                 return unit
         return False
 
-    def warn(self, message):
-        """ Used internally by game_state to print warnings
+    def warn(self, message, *args):
+        """ Used internally by game_state to print warnings. 
+        The message is only formatted with args if it is printed.
         """
 
         if(self.enable_warnings):
-            debug_write(message)
+            log(WARNING, message, *args)
 
     def suppress_warnings(self, suppress):
         """Suppress all warnings
@@ -523,7 +686,8 @@ class GameState:
         """
 
         self.enable_warnings = not suppress
-        self.game_map.enable_warnings = not suppress
+        if self._game_map is not None:
+            self._game_map.enable_warnings = not suppress
 
     def get_target(self, attacking_unit):
         """Returns target of given unit based on current map of the game board. 
@@ -541,11 +705,11 @@ class GameState:
         """
 
         if not isinstance(attacking_unit, GameUnit):
-            self.warn("Passed a {} to get_target as attacking_unit. Expected a GameUnit.".format(type(attacking_unit)))
+            self.warn("Passed a {} to get_target as attacking_unit. Expected a GameUnit.", type(attacking_unit))
             return
 
         attacker_location = [attacking_unit.x, attacking_unit.y]
-        possible_locations = self.game_map.get_locations_in_range(attacker_location, attacking_unit.attackRange)
+        possible_locations = self.game_map.get_cached_locations_in_range(attacker_location, attacking_unit.attackRange)
         target = None
         target_stationary = True
         target_distance = sys.maxsize
@@ -553,7 +717,12 @@ class GameState:
         target_y = self.ARENA_SIZE
         target_x_distance = 0
 
+        stationary_owner = self.game_map.stationary_owner
+        mobile_count = self.game_map.mobile_count
         for location in possible_locations:
+            index = location[0] * self.ARENA_SIZE + location[1]
+            if stationary_owner[index] < 0 and mobile_count[0][index] == 0 and mobile_count[1][index] == 0:
+                continue
             for unit in self.game_map[location]:
                 if unit.player_index == attacking_unit.player_index or (attacking_unit.damage_f == 0 and is_stationary(unit.unit_type)) or (attacking_unit.damage_i == 0 and not(is_stationary(unit.unit_type))):
                     continue
@@ -604,6 +773,89 @@ class GameState:
                     target_x_distance = unit_x_distance
         return target
 
+    def get_targets(self, attackers, use_numpy=False):
+        """Gets the target of many attacking units at once, giving exactly the units get_target would give for each of them.
+
+        The units on the board and their targeting priorities are gathered once instead of once per attacker, 
+        and each attacker takes the candidate in range with the smallest priority key. With NumPy, the priority 
+        is instead resolved for every attacker together by keeping, one priority at a time, only the candidates 
+        that are best at it, which pays off when there are many attackers close to many units. 
+        Units are never damaged in between, so every attacker sees the board as it is now.
+
+        Args:
+            attackers: A list of GameUnits
+            use_numpy: Resolve the targets with NumPy arrays. Ignored if NumPy is not installed.
+
+        Returns:
+            A list holding the target of each attacker, or None for attackers without one, in the order of attackers
+
+        """
+        for attacker in attackers:
+            if not isinstance(attacker, GameUnit):
+                self.warn("Passed a {} to get_targets as an attacking unit. Expected a GameUnit.", type(attacker))
+                return [self.get_target(attacker) if isinstance(attacker, GameUnit) else None for attacker in attackers]
+        if not attackers:
+            return []
+
+        # Candidates are gathered in the order get_target looks at them, by x, then y, then position in the list, 
+        # so taking the first of several equally good candidates breaks ties the same way
+        stationary_owner = self.game_map.stationary_owner
+        mobile_0, mobile_1 = self.game_map.mobile_count
+        units = []
+        for index in [index for index in _CELLS_BY_X if stationary_owner[index] >= 0 or mobile_0[index] or mobile_1[index]]:
+            units.extend(self.game_map[divmod(index, self.ARENA_SIZE)])
+        if not units:
+            return [None] * len(attackers)
+        if use_numpy and np is not None:
+            return self.__get_targets_numpy(attackers, units)
+        return self.__get_targets_python(attackers, units)
+
+    def __target_keys(self, units):
+        """Gets (x, y, player_index, firewall type, stationary, health, key for y, key for x) for every candidate unit, 
+        where smaller keys are preferred. The key for y is for player 0 attackers and is negated for player 1. 
+        Like get_target, the type decides what an attacker can hit and the unit's stationary attribute decides the priority.
+        """
+        return [(unit.x, unit.y, unit.player_index, is_stationary(unit.unit_type), unit.stationary, unit.health, unit.y,
+                 -abs(self.ARENA_SIZE - 1 - 2 * unit.x)) for unit in units]
+
+    def __get_targets_python(self, attackers, units):
+        cells = {}
+        for unit, keys in zip(units, self.__target_keys(units)):
+            cells.setdefault((unit.x, unit.y), []).append((unit, keys))
+        targets = []
+        for attacker in attackers:
+            y_sign = 1 if attacker.player_index == 0 else -1
+            best = None
+            best_key = None
+            for location in self.game_map.get_cached_locations_in_range([attacker.x, attacker.y], attacker.attackRange):
+                for unit, (x, y, player_index, firewall, stationary, health, y_key, x_key) in cells.get(location, ()):
+                    if player_index == attacker.player_index or (attacker.damage_f == 0 and firewall) or (attacker.damage_i == 0 and not firewall):
+                        continue
+                    key = (stationary, (x - attacker.x) ** 2 + (y - attacker.y) ** 2, health, y_sign * y_key, x_key)
+                    if best_key is None or key < best_key:
+                        best, best_key = unit, key
+            targets.append(best)
+        return targets
+
+    def __get_targets_numpy(self, attackers, units):
+        unit_x, unit_y, unit_player, unit_firewall, unit_stationary, unit_health, unit_y_key, unit_x_key = \
+            np.array(self.__target_keys(units), dtype=np.float64).T
+        hit_radius = self.config["unitInformation"][0].get("getHitRadius", 0)
+        attacker_x, attacker_y, attacker_player, reach, hits_firewalls, hits_information = np.array(
+            [(attacker.x, attacker.y, attacker.player_index, attacker.attackRange + hit_radius, attacker.damage_f != 0, attacker.damage_i != 0)
+             for attacker in attackers], dtype=np.float64).T[:, :, np.newaxis]
+
+        distance = (unit_x - attacker_x) ** 2 + (unit_y - attacker_y) ** 2
+        candidates = (np.sqrt(distance) < reach) & (unit_player != attacker_player) \
+            & np.where(unit_firewall != 0, hits_firewalls != 0, hits_information != 0)
+        y_key = np.where(attacker_player == 0, unit_y_key, -unit_y_key)
+        for key in (unit_stationary, distance, unit_health, y_key, unit_x_key):
+            best = np.where(candidates, key, np.inf).min(axis=1, keepdims=True)
+            candidates &= key == best
+        first = candidates.argmax(axis=1)
+        found = candidates.any(axis=1)
+        return [units[index] if has_target else None for index, has_target in zip(first.tolist(), found.tolist())]
+
     def get_attackers(self, location, player_index):
         """Gets the stationary units threatening a given location
 
@@ -618,20 +870,164 @@ class GameState:
 
         if not player_index == 0 and not player_index == 1:
             self._invalid_player_index(player_index)
+            return []
         if not self.game_map.in_arena_bounds(location):
-            self.warn("Location {} is not in the arena bounds.".format(location))
+            self.warn("Location {} is not in the arena bounds.", location)
+            return []
 
         attackers = []
+        if self.game_map.get_coverage().get_attacker_count(location, player_index) == 0:
+            return attackers
         """
         Get locations in the range of DESTRUCTOR units
         """
         max_range = 0
         for unit in self.config["unitInformation"]:
-            if unit.get('attackRange', 0) >= max_range:
-                max_range = unit.get('attackRange', 0)
-        possible_locations= self.game_map.get_locations_in_range(location, max_range)
-        for location_unit in possible_locations:
+            max_range = max(max_range, unit.get('attackRange', 0), unit.get('upgrade', {}).get('attackRange', 0))
+        x, y = map(int, location)
+        stationary_owner = self.game_map.stationary_owner
+        for location_unit in self.game_map.get_cached_locations_in_range([x, y], max_range):
+            if stationary_owner[location_unit[0] * self.ARENA_SIZE + location_unit[1]] != 1 - player_index:
+                continue
             for unit in self.game_map[location_unit]:
-                if unit.damage_i + unit.damage_f > 0 and unit.player_index != player_index and self.game_map.distance_between_locations(location, location_unit) >= unit.attackRange:
+                if unit.stationary and unit.damage_i + unit.damage_f > 0 and (x, y) in self.game_map.get_cached_locations_in_range(location_unit, unit.attackRange):
                     attackers.append(unit)
         return attackers
+
+    def get_damage_at(self, location, player_index=0):
+        """Gets the damage per frame enemy firewalls would deal to a unit at a location
+
+        Args:
+            location: The location of a hypothetical defender
+            player_index: The index corresponding to the defending player, 0 for you 1 for the enemy
+
+        Returns:
+            The total damage per frame of every enemy firewall in range of the location
+
+        """
+        if not player_index == 0 and not player_index == 1:
+            self._invalid_player_index(player_index)
+            return 0
+        if not self.game_map.in_arena_bounds(location):
+            self.warn("Location {} is not in the arena bounds.", location)
+            return 0
+        x, y = map(int, location)
+        return self.game_map.get_coverage().get_damage([x, y], player_index)
+
+    def score_paths(self, paths, unit_type, player_index=0, health=None, use_numpy=True):
+        """Scores one or many paths by the damage a unit of a given type would take following them, 
+        using the per turn damage coverage of the map.
+
+        The unit is taken to stay on each location for as many frames as it needs to move once, 
+        one frame less on its first location, and to leave the board on arriving at the last location 
+        if that is on the edge it is heading for. Like get_path_damage, it ignores shields and the 
+        firewalls the unit may destroy, and assumes every firewall in range attacks it on every frame.
+
+        Args:
+            paths: A path, as a list of locations such as the result of find_path_to_edge, or a list of paths. 
+                None, which find_path_to_edge returns for blocked starts, stands for a path that can not be scored.
+            unit_type: The type of the unit following the paths, which sets its speed and health
+            player_index: The index corresponding to the player whose unit follows the paths, 0 for you 1 for the enemy
+            health: The health of the unit, by default the starting health of unit_type
+            use_numpy: Score the paths with NumPy array gathers. Ignored if NumPy is not installed.
+
+        Returns:
+            A PathScore for a single path, or a list of PathScores in the order of paths. 
+            None in place of the score of every path that is None, and an empty list for an empty list of paths.
+
+        """
+        if not player_index == 0 and not player_index == 1:
+            self._invalid_player_index(player_index)
+            return None
+        if unit_type not in ALL_UNITS or is_stationary(unit_type):
+            self._invalid_unit(unit_type)
+            return None
+        if paths is None:
+            return None
+        single = bool(paths) and bool(paths[0]) and not isinstance(paths[0][0], (list, tuple))
+        if single:
+            paths = [paths]
+        given = paths
+        paths = [path for path in given if path is not None]
+        stats = get_unit_stats(self.config, unit_type)
+        frames_per_move = max(1, int(round(1 / stats.speed))) if stats.speed > 0 else 1
+        if health is None:
+            health = stats.max_health
+
+        # The frames spent on each location of each path, with breaches taking no frames on the last location
+        edges = [set(map(tuple, edge)) for edge in self.game_map.get_edges()]
+        frames = []
+        for path in paths:
+            path_frames = [frames_per_move] * len(path)
+            if path_frames:
+                path_frames[0] -= 1
+                if len(path) > 1 and tuple(path[-1]) in edges[self.get_target_edge(path[0])]:
+                    path_frames[-1] = 0
+            frames.append(path_frames)
+
+        damage = self.game_map.get_coverage().damage[1 - player_index]
+        if use_numpy and np is not None and paths:
+            scores = self.__score_paths_numpy(paths, frames, damage, health)
+        else:
+            scores = self.__score_paths_python(paths, frames, damage, health)
+        if len(paths) < len(given):
+            scores = iter(scores)
+            scores = [None if path is None else next(scores) for path in given]
+        return scores[0] if single else scores
+
+    def __score_paths_python(self, paths, frames, damage, health):
+        scores = []
+        for path, path_frames in zip(paths, frames):
+            total = 0.0
+            cumulative = []
+            frames_in_range = 0
+            death_index = None
+            for index, (location, location_frames) in enumerate(zip(path, path_frames)):
+                location_damage = damage[location[0] * self.ARENA_SIZE + location[1]]
+                total += location_damage * location_frames
+                cumulative.append(total)
+                if location_damage > 0:
+                    frames_in_range += location_frames
+                if death_index is None and total >= health and location_frames and location_damage > 0:
+                    death_index = index
+            scores.append(PathScore(total, cumulative, frames_in_range, death_index))
+        return scores
+
+    def __score_paths_numpy(self, paths, frames, damage, health):
+        length = max(len(path) for path in paths)
+        cells = np.zeros((len(paths), length), dtype=np.int64)
+        weights = np.zeros((len(paths), length))
+        for row, (path, path_frames) in enumerate(zip(paths, frames)):
+            if path:
+                cells[row, :len(path)] = [x * self.ARENA_SIZE + y for x, y in path]
+                weights[row, :len(path)] = path_frames
+        per_location = np.frombuffer(damage, dtype=np.float64)[cells]
+        taken = per_location * weights
+        cumulative = np.cumsum(taken, axis=1)
+        frames_in_range = np.where(per_location > 0, weights, 0).sum(axis=1)
+        dying = (cumulative >= health) & (taken > 0)
+        death_index = np.where(dying.any(axis=1), dying.argmax(axis=1), -1)
+
+        scores = []
+        for row, path in enumerate(paths):
+            path_cumulative = cumulative[row, :len(path)].tolist()
+            scores.append(PathScore(path_cumulative[-1] if path_cumulative else 0.0, path_cumulative,
+                                    int(frames_in_range[row]), None if death_index[row] < 0 else int(death_index[row])))
+        return scores
+
+    def get_path_damage(self, path, player_index=0):
+        """Estimates the damage a unit would take along a path, using the per turn damage coverage of the map
+
+        Args:
+            path: A list of locations, such as the result of find_path_to_edge
+            player_index: The index corresponding to the player whose unit follows the path, 0 for you 1 for the enemy
+
+        Returns:
+            The sum, over every location on the path, of the damage per frame enemy firewalls deal at that location
+
+        """
+        if not player_index == 0 and not player_index == 1:
+            self._invalid_player_index(player_index)
+            return 0
+        damage = self.game_map.get_coverage().damage[1 - player_index]
+        return sum(damage[location[0] * self.ARENA_SIZE + location[1]] for location in path)
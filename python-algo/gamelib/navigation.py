@@ -1,24 +1,120 @@
 import heapq
 import math
 import sys
-import queue
+import copy
+from collections import deque
 from .util import debug_write
+from .cache import LRUCache
+from .game_map import ARENA_SIZE, ARENA_MASK, ARENA_LOCATIONS
 
-class Node:
-    """A pathfinding node
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-    Attributes :
-        * visited_idealness (bool): Have we visited this node during the idealness search step?
-        * visited_validate (bool): Have we visited this node during the validation step?
-        * blocked (bool): Is there a firewall at this node's location
-        * pathlength: The distance between this node and the target location
+PYTHON_BACKEND = "python"
+NUMPY_BACKEND = "numpy"
+_default_backend = PYTHON_BACKEND
+
+def set_default_backend(backend):
+    """Sets the search backend used by ShortestPathFinders created without an explicit backend
+
+    Args:
+        backend: PYTHON_BACKEND or NUMPY_BACKEND. NUMPY_BACKEND falls back to PYTHON_BACKEND if NumPy is not installed.
+
+    """
+    global _default_backend
+    if backend not in (PYTHON_BACKEND, NUMPY_BACKEND):
+        debug_write("Invalid pathfinding backend '{}'. Use '{}' or '{}'.".format(backend, PYTHON_BACKEND, NUMPY_BACKEND))
+        return
+    _default_backend = backend
+
+def _build_neighbor_table():
+    """For every location, the adjacent locations that are on the board, in the order given by _get_neighbors
+    """
+    table = []
+    for x in range(ARENA_SIZE):
+        column = []
+        for y in range(ARENA_SIZE):
+            neighbors = [[x, y + 1], [x, y - 1], [x + 1, y], [x - 1, y]]
+            column.append(tuple(n for n in neighbors if 0 <= n[0] < ARENA_SIZE and 0 <= n[1] < ARENA_SIZE and ARENA_MASK[n[0]][n[1]]))
+        table.append(tuple(column))
+    return tuple(table)
+
+# Built once at import from the shared arena mask so the searches never need to bounds check a neighbor.
+# The neighbor lists are shared, so they must never be mutated or handed out to callers.
+ARENA_NEIGHBORS = _build_neighbor_table()
+
+# The same tables using flat cell indices (x * ARENA_SIZE + y), which is how the searches store their results
+_CELL_COUNT = ARENA_SIZE * ARENA_SIZE
+_ARENA_CELLS = tuple(x * ARENA_SIZE + y for x, y in ARENA_LOCATIONS)
+_NEIGHBOR_INDICES = tuple(tuple(n[0] * ARENA_SIZE + n[1] for n in ARENA_NEIGHBORS[index // ARENA_SIZE][index % ARENA_SIZE])
+                          for index in range(_CELL_COUNT))
+
+def _build_numpy_idealness():
+    """Builds flat arrays holding the idealness of every tile, for each direction returned by _get_direction_from_endpoints
+    """
+    idealness = {}
+    for direction_x in (-1, 1):
+        for direction_y in (-1, 1):
+            column = np.arange(ARENA_SIZE) if direction_x == 1 else 27 - np.arange(ARENA_SIZE)
+            row = np.arange(ARENA_SIZE) if direction_y == 1 else 27 - np.arange(ARENA_SIZE)
+            idealness[(direction_x, direction_y)] = (28 * row[np.newaxis, :] + column[:, np.newaxis]).ravel()
+    return idealness
+
+# Arrays used by the NumPy backend, indexed [x, y] before flattening
+if np is not None:
+    _NUMPY_ARENA = np.array(ARENA_MASK, dtype=bool)
+    _NUMPY_IDEALNESS = _build_numpy_idealness()
+
+# Turns the bytes of GameMap.stationary_owner into a blocked mask, an owner of -1 (255 as a byte) means the cell is open
+_BLOCKED_BYTES = bytes(0 if value == 255 else 1 for value in range(256))
+
+class PathCache(LRUCache):
+    """Remembers the paths found by GameState.find_path_to_edge, keyed by the walls they were found on, 
+    their start and their target edge.
+
+    Walls are identified by GameMap.wall_hash, so changing the walls changes the key and old paths are simply 
+    never looked up again, until the least recently used ones are evicted. The cache is kept at module level 
+    as PATH_CACHE, so it lasts from turn to turn: both players' walls change slowly, and every layout seen 
+    before, including the one a trial or rollback goes back to, is still cached. Paths are stored as tuples 
+    of cell indices and every lookup returns a new list, so callers may change the paths they get.
+
+    Use hit_rate(), hits and misses to tune the size with resize(), and clear() to empty it.
 
     """
-    def __init__(self):
-        self.visited_idealness = False
-        self.visited_validate = False
-        self.blocked = False
-        self.pathlength = -1
+    def __init__(self, maxsize=4096):
+        """Creates an empty cache
+
+        Args:
+            maxsize: The most paths the cache holds
+
+        """
+        LRUCache.__init__(self, maxsize)
+
+    def get_path(self, wall_hash, start_location, target_edge):
+        """Looks up a path
+
+        Args:
+            wall_hash: The GameMap.wall_hash of the map the path is on
+            start_location: The location the path starts at
+            target_edge: The edge the path heads for
+
+        Returns:
+            The path as a list of [x, y] locations, starting with start_location, or None if it is not cached
+        """
+        cells = self.get((wall_hash, start_location[0], start_location[1], target_edge))
+        if cells is None:
+            return None
+        return [start_location] + [[index // ARENA_SIZE, index % ARENA_SIZE] for index in cells]
+
+    def put_path(self, wall_hash, start_location, target_edge, path):
+        """Stores a path. Takes the same arguments as get_path, and the path found for them
+        """
+        self.put((wall_hash, start_location[0], start_location[1], target_edge),
+                 tuple(x * ARENA_SIZE + y for x, y in path[1:]))
+
+PATH_CACHE = PathCache()
 
 """
 This class helps with pathfinding. We guarantee the results will
@@ -28,29 +124,106 @@ code to maximise time efficiency
 class ShortestPathFinder:
     """Handles pathfinding
 
+    The finder remembers the wall layout it last searched along with the results of its searches: 
+    which 'pocket' of connected open tiles each location is in, the most ideal tile of each pocket and 
+    the pathlength field computed by _validate for each target. When it is asked for another path on 
+    the same walls it reuses them and only walks the path. When walls are added or removed it throws 
+    away the pockets, and only the pathlength fields that the changed tiles could affect.
+
+    The searches can run on one of two backends with identical results. PYTHON_BACKEND uses plain 
+    breadth first searches. NUMPY_BACKEND expands whole frontiers at once with array operations 
+    and picks the most ideal tile with an argmax, and is only available when NumPy is installed.
+
     Attributes :
         * HORIZONTAL (int): A constant representing a horizontal movement
         * VERTICAL (int): A constant representing a vertical movement
 
         * game_state (:obj: GameState): The current gamestate
-        * game_map (:obj: GameMap): The current gamemap
+        * initialized (bool): True once initialize_map has been called
+        * backend (str): The backend in use, PYTHON_BACKEND or NUMPY_BACKEND
 
     """
-    def __init__(self):
+    def __init__(self, backend=None):
+        """
+        Args:
+            backend: PYTHON_BACKEND or NUMPY_BACKEND, or None to use the default set with set_default_backend. 
+                NUMPY_BACKEND falls back to PYTHON_BACKEND if NumPy is not installed.
+        """
         self.HORIZONTAL = 1
         self.VERTICAL = 2
+        self.backend = backend if backend is not None else _default_backend
+        if self.backend == NUMPY_BACKEND and np is None:
+            self.backend = PYTHON_BACKEND
         self.initialized = False
+        self.game_state = None
+        self._wall_snapshot = None
+        self._blocked = None
+        self._pathlength = None
+        self._pockets = None
+        self._pocket_cells = None
+        self._ideal_tiles = {}
+        self._fields = {}
+        self._open_array = None
+
+    def clone(self):
+        """Makes a copy of this pathfinder that starts with the same search results, for use with a cloned GameState. 
+        Search results are never changed once made, so they are shared rather than copied.
+
+        Returns:
+            A new ShortestPathFinder
+        """
+        clone = copy.copy(self)
+        clone._ideal_tiles = dict(self._ideal_tiles)
+        clone._fields = dict(self._fields)
+        return clone
 
     def initialize_map(self, game_state):
-        """Initializes the map
+        """Initializes the map, reusing previous search results if the walls have not changed
 
         Args:
             game_state: A GameState object representing the gamestate we want to traverse
         """
-        #Initialize map 
         self.initialized = True
         self.game_state = game_state
-        self.game_map = [[Node() for x in range(self.game_state.ARENA_SIZE)] for y in range(self.game_state.ARENA_SIZE)]
+        self._update_walls(game_state.game_map.stationary_owner.tobytes())
+
+    def _update_walls(self, snapshot):
+        """Brings the blocked mask in line with a snapshot of GameMap.stationary_owner, 
+        dropping only the cached results the changed tiles could affect
+        """
+        if snapshot == self._wall_snapshot:
+            return
+        blocked = bytearray(snapshot.translate(_BLOCKED_BYTES))
+        previous = self._blocked
+        self._wall_snapshot = snapshot
+        self._blocked = blocked
+        if previous == blocked:
+            return
+
+        self._pockets = None
+        self._pocket_cells = None
+        self._ideal_tiles = {}
+        self._open_array = None
+        if previous is None:
+            self._fields = {}
+            return
+        changed = [index for index in _ARENA_CELLS if blocked[index] != previous[index]]
+        for seeds, field in list(self._fields.items()):
+            if self._field_affected(seeds, field, changed):
+                del self._fields[seeds]
+
+    def _field_affected(self, seeds, field, changed):
+        """A pathlength field only changes if a changed tile is a seed, was reached by the search, 
+        or is next to a tile the search reached
+        """
+        seed_indices = set(seed[0] * ARENA_SIZE + seed[1] for seed in seeds)
+        for index in changed:
+            if index in seed_indices or field[index] >= 0:
+                return True
+            for neighbor in _NEIGHBOR_INDICES[index]:
+                if field[neighbor] >= 0:
+                    return True
+        return False
 
     def navigate_multiple_endpoints(self, start_point, end_points, game_state):
         """Finds the path a unit would take to reach a set of endpoints
@@ -67,46 +240,102 @@ class ShortestPathFinder:
         """
         if game_state.contains_stationary_unit(start_point):
             return
+        if not game_state.game_map.in_arena_bounds(start_point):
+            return
 
         #Initialize map 
         self.initialize_map(game_state)
-        #Fill in walls
-        for location in self.game_state.game_map:
-            if self.game_state.contains_stationary_unit(location):
-                self.game_map[location[0]][location[1]].blocked = True
         #Do pathfinding
         ideal_endpoints = self._idealness_search(start_point, end_points)
         self._validate(ideal_endpoints, end_points)
         return self._get_path(start_point, end_points)
 
+    def navigate_multiple_starts(self, start_points, end_points, game_state):
+        """Finds the paths units at several start points would take to reach the same set of endpoints
+
+        The walls are read once, and starts that share a pocket of open tiles share its idealness 
+        and validation searches, so this is much cheaper than pathing each start on its own.
+
+        Args:
+            * start_points: A list of starting locations
+            * end_points: The end points of the units, should be a list of edge locations
+            * game_state: The current game state
+
+        Returns:
+            A list with the path from each start point, in the same order as start_points. 
+            Start points that are blocked or off the board get None instead of a path.
+
+        """
+        self.initialize_map(game_state)
+        paths = []
+        blocked = self._blocked
+        for start_point in start_points:
+            if not game_state.game_map.in_arena_bounds(start_point) or blocked[start_point[0] * ARENA_SIZE + start_point[1]]:
+                paths.append(None)
+                continue
+            ideal_endpoints = self._idealness_search(start_point, end_points)
+            self._validate(ideal_endpoints, end_points)
+            paths.append(self._get_path(start_point, end_points))
+        return paths
+
+    def _label_pockets(self):
+        """Labels every open tile with the pocket of connected open tiles it belongs to
+        """
+        blocked = self._blocked
+        pockets = [-1] * _CELL_COUNT
+        pocket_cells = []
+        for start in _ARENA_CELLS:
+            if blocked[start] or pockets[start] >= 0:
+                continue
+            label = len(pocket_cells)
+            cells = [start]
+            pockets[start] = label
+            for index in cells:
+                for neighbor in _NEIGHBOR_INDICES[index]:
+                    if pockets[neighbor] < 0 and not blocked[neighbor]:
+                        pockets[neighbor] = label
+                        cells.append(neighbor)
+            pocket_cells.append(cells)
+        self._pockets = pockets
+        self._pocket_cells = pocket_cells
+
     def _idealness_search(self, start, end_points):
         """
         Finds the most ideal tile in our 'pocket' of pathable space. 
         The edge if it is available, or the best self destruct location otherwise
         """
-        current = queue.Queue()
-        current.put(start)
-        best_idealness = self._get_idealness(start, end_points)
-        self.game_map[start[0]][start[1]].visited_idealness = True
-        most_ideal = start
-
-        while not current.empty():
-            search_location = current.get()
-            for neighbor in self._get_neighbors(search_location):
-                if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
-                    continue
-
-                x, y = neighbor
-                current_idealness = self._get_idealness(neighbor, end_points)
-
-                if current_idealness > best_idealness:
-                    best_idealness = current_idealness
-                    most_ideal = neighbor
+        if self._pockets is None:
+            self._label_pockets()
+        pocket = self._pockets[start[0] * ARENA_SIZE + start[1]]
+        key = (pocket, tuple((location[0], location[1]) for location in end_points))
+        most_ideal = self._ideal_tiles.get(key)
+        if most_ideal is None:
+            most_ideal = self._most_ideal_in_pocket(self._pocket_cells[pocket], end_points)
+            self._ideal_tiles[key] = most_ideal
+        return most_ideal
 
-                if not self.game_map[x][y].visited_idealness and not self.game_map[x][y].blocked:
-                    self.game_map[x][y].visited_idealness = True
-                    current.put(neighbor)
+    def _most_ideal_in_pocket(self, cells, end_points):
+        """Every endpoint is perfectly ideal, and every other tile has a distinct idealness, 
+        so the most ideal tile of a pocket does not depend on where in the pocket the unit starts
+        """
+        end_indices = set(location[0] * ARENA_SIZE + location[1] for location in end_points)
+        for index in cells:
+            if index in end_indices:
+                return [index // ARENA_SIZE, index % ARENA_SIZE]
 
+        direction = self._get_direction_from_endpoints(end_points)
+        if self.backend == NUMPY_BACKEND:
+            cell_array = np.array(cells)
+            index = int(cell_array[np.argmax(_NUMPY_IDEALNESS[tuple(direction)][cell_array])])
+            return [index // ARENA_SIZE, index % ARENA_SIZE]
+        best_idealness = -1
+        most_ideal = None
+        for index in cells:
+            x, y = divmod(index, ARENA_SIZE)
+            idealness = 28 * (y if direction[1] == 1 else 27 - y) + (x if direction[0] == 1 else 27 - x)
+            if idealness > best_idealness:
+                best_idealness = idealness
+                most_ideal = [x, y]
         return most_ideal
 
     def _get_neighbors(self, location):
@@ -159,40 +388,78 @@ class ShortestPathFinder:
         return idealness
 
     def _validate(self, ideal_tile, end_points):
-        """Breadth first search of the grid, setting the pathlengths of each node
+        """Breadth first search of the grid, setting the pathlengths of each node. 
+        The result is kept for as long as the walls it depends on stay the same.
 
         """
         #VALDIATION
         #Add our most ideal tiles to current
-        current = queue.Queue()
         if ideal_tile in end_points:
-            for location in end_points:
-               current.put(location)
-               #Set current pathlength to 0
-               self.game_map[location[0]][location[1]].pathlength = 0
-               self.game_map[location[0]][location[1]].visited_validate = True
+            seeds = tuple((location[0], location[1]) for location in end_points)
         else:
-            current.put(ideal_tile)
-            self.game_map[ideal_tile[0]][ideal_tile[1]].pathlength = 0
-            self.game_map[ideal_tile[0]][ideal_tile[1]].visited_validate = True
+            seeds = ((ideal_tile[0], ideal_tile[1]),)
+
+        field = self._fields.get(seeds)
+        if field is None:
+            field = self._search_pathlengths(seeds)
+            self._fields[seeds] = field
+        self._pathlength = field
+
+    def _search_pathlengths(self, seeds):
+        """Breadth first search outward from the seeds, which all have pathlength 0. 
+        Blocked seeds keep their pathlength but are never expanded.
+
+        """
+        if self.backend == NUMPY_BACKEND:
+            return self._search_pathlengths_numpy(seeds)
+        blocked = self._blocked
+        pathlength = [-1] * _CELL_COUNT
+        current = deque()
+        for x, y in seeds:
+            index = x * ARENA_SIZE + y
+            pathlength[index] = 0
+            current.append(index)
 
         #While current is not empty
-        while not current.empty():
-            current_location = current.get()
-            current_node = self.game_map[current_location[0]][current_location[1]]
-            for neighbor in self._get_neighbors(current_location):
-                if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
-                    continue
-
-                neighbor_node = self.game_map[neighbor[0]][neighbor[1]]
-                if not neighbor_node.visited_validate and not current_node.blocked:
-                    neighbor_node.pathlength = current_node.pathlength + 1
-                    neighbor_node.visited_validate = True
-                    current.put(neighbor)
-
-        #debug_write("Print after validate")
-        #self.print_map()
-        return
+        while current:
+            index = current.popleft()
+            if blocked[index]:
+                continue
+            next_pathlength = pathlength[index] + 1
+            for neighbor in _NEIGHBOR_INDICES[index]:
+                if pathlength[neighbor] < 0 and not blocked[neighbor]:
+                    pathlength[neighbor] = next_pathlength
+                    current.append(neighbor)
+        return pathlength
+
+    def _search_pathlengths_numpy(self, seeds):
+        """The same search as _search_pathlengths, expanding a whole frontier of tiles with each array operation. 
+        Breadth first pathlengths do not depend on the order tiles are visited in, so the fields are identical.
+
+        """
+        if self._open_array is None:
+            blocked = np.frombuffer(bytes(self._blocked), dtype=np.uint8).reshape(ARENA_SIZE, ARENA_SIZE)
+            self._open_array = _NUMPY_ARENA & (blocked == 0)
+        open_tiles = self._open_array
+
+        pathlength = np.full((ARENA_SIZE, ARENA_SIZE), -1, dtype=np.int64)
+        for x, y in seeds:
+            pathlength[x, y] = 0
+        visited = pathlength >= 0
+        frontier = visited & open_tiles
+
+        next_pathlength = 1
+        while frontier.any():
+            reached = np.zeros_like(frontier)
+            reached[:, 1:] |= frontier[:, :-1]
+            reached[:, :-1] |= frontier[:, 1:]
+            reached[1:, :] |= frontier[:-1, :]
+            reached[:-1, :] |= frontier[1:, :]
+            frontier = reached & open_tiles & ~visited
+            pathlength[frontier] = next_pathlength
+            visited |= frontier
+            next_pathlength += 1
+        return pathlength.ravel().tolist()
 
     def _get_path(self, start_point, end_points):
         """Once all nodes are validated, and a target is found, the unit can path to its target
@@ -202,10 +469,11 @@ class ShortestPathFinder:
         path = [start_point]
         current = start_point
         move_direction = 0
+        pathlength = self._pathlength
 
-        while not self.game_map[current[0]][current[1]].pathlength == 0:
-            #debug_write("current tile {} has cost {}".format(current, self.game_map[current[0]][current[1]].pathlength))
-            next_move = self._choose_next_move(current, move_direction, end_points)
+        while not pathlength[current[0] * ARENA_SIZE + current[1]] == 0:
+            #debug_write("current tile {} has cost {}".format(current, pathlength[current[0] * ARENA_SIZE + current[1]]))
+            next_move = list(self._choose_next_move(current, move_direction, end_points))
             #debug_write(next_move)
 
             if current[0] == next_move[0]:
@@ -221,19 +489,21 @@ class ShortestPathFinder:
     def _choose_next_move(self, current_point, previous_move_direction, end_points):
         """Given the current location and adjacent locations, return the best 'next step' for a given unit to take
         """
-        neighbors = self._get_neighbors(current_point)
+        neighbors = ARENA_NEIGHBORS[current_point[0]][current_point[1]]
         #debug_write("Unit at {} previously moved {} and has these neighbors {}".format(current_point, previous_move_direction, neighbors))
+        pathlength = self._pathlength
+        blocked = self._blocked
 
         ideal_neighbor = current_point
-        best_pathlength = self.game_map[current_point[0]][current_point[1]].pathlength
+        best_pathlength = pathlength[current_point[0] * ARENA_SIZE + current_point[1]]
         for neighbor in neighbors:
             #debug_write("Comparing champ {} and contender {}".format(ideal_neighbor, neighbor))
-            if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
+            index = neighbor[0] * ARENA_SIZE + neighbor[1]
+            if blocked[index]:
                 continue
 
             new_best = False
-            x, y = neighbor
-            current_pathlength = self.game_map[x][y].pathlength
+            current_pathlength = pathlength[index]
 
             #Filter by pathlength
             if current_pathlength > best_pathlength:
@@ -290,18 +560,18 @@ class ShortestPathFinder:
         return True
 
     def print_map(self):
-        """Prints an ASCII version of the current game map for debug purposes
+        """Prints an ASCII version of the pathlengths from the last search for debug purposes
 
         """
-        if not self.initialized:
-            debug_write("Attempted to print_map before pathfinder initialization. Use 'this_object.initialize_map(game_state)' to initialize the map first")
+        if not self.initialized or self._pathlength is None:
+            debug_write("Attempted to print_map before pathfinder initialization. Use 'this_object.navigate_multiple_endpoints(start_point, end_points, game_state)' to run a search first")
             return
 
         for y in range(28):
             for x in range(28):
-                node = self.game_map[x][28 - y - 1]
-                if not node.blocked and not node.pathlength == -1:
-                    self._print_justified(node.pathlength)
+                index = x * ARENA_SIZE + 28 - y - 1
+                if not self._blocked[index] and not self._pathlength[index] == -1:
+                    self._print_justified(self._pathlength[index])
                 else:
                     sys.stderr.write("   ")
             debug_write("")
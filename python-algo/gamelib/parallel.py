@@ -0,0 +1,197 @@
+import os
+import pickle
+import concurrent.futures
+import concurrent.futures.process
+
+from .util import debug_write
+
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:
+    shared_memory = None
+
+# The snapshot a worker process has loaded, as (snapshot id, object). Only used inside worker processes.
+_worker_snapshot = (None, None)
+
+def _ready():
+    """Does nothing, submitted once per worker so the processes are started before they are needed
+    """
+    return os.getpid()
+
+def _load_snapshot(snapshot_id, name, size):
+    """Gets the snapshot in a worker process, reading it from shared memory the first time each snapshot is used
+    """
+    global _worker_snapshot
+    if _worker_snapshot[0] != snapshot_id:
+        block = shared_memory.SharedMemory(name=name)
+        try:
+            _worker_snapshot = (snapshot_id, pickle.loads(block.buf[:size]))
+        finally:
+            block.close()
+    return _worker_snapshot[1]
+
+def _evaluate_chunk(snapshot_id, name, size, function, candidates):
+    """Runs in a worker process, evaluating a chunk of candidates against the current snapshot
+    """
+    snapshot = _load_snapshot(snapshot_id, name, size)
+    return [function(snapshot, candidate) for candidate in candidates]
+
+
+class WorkerPool:
+    """Evaluates candidates, for example paths, deploys or build plans, on a pool of worker processes.
+
+    Starting processes is slow, so the pool is meant to be created once in on_game_start with
+    AlgoCore.start_worker_pool and kept for the whole game. Once per turn, set_snapshot pickles the
+    object every evaluation needs, usually a GameState, into shared memory. Each worker unpickles
+    it the first time it gets a task for that turn, so tasks only carry their candidates.
+
+    Evaluation functions are called as function(snapshot, candidate). They are sent to the workers by name,
+    so they must be defined at the top level of a module, and should return small values such as tuples of numbers.
+    The snapshot is shared by every candidate a worker evaluates, so functions should use snapshot.clone()
+    or snapshot.checkpoint() before changing it. Workers share stdin and stdout with the algo,
+    so functions must never read input or call send_command.
+
+    With 0 workers, or if the processes can not be started, candidates are evaluated one by one in the algo's own process.
+
+    Chunks still running when map times out keep reading their snapshot, so a replaced snapshot's shared memory 
+    is only freed once every chunk submitted against it has finished. Chunks that have not started are cancelled.
+
+    Attributes :
+        * workers (int): The number of worker processes, 0 if candidates are evaluated in this process
+        * snapshot: The object set with set_snapshot
+
+    """
+    def __init__(self, workers=None):
+        """Starts the worker processes and waits for them to be ready
+
+        Args:
+            workers: The number of worker processes. By default one less than the number of CPUs, leaving one for the algo.
+
+        """
+        if workers is None:
+            workers = (os.cpu_count() or 1) - 1
+        self.workers = max(0, int(workers))
+        self.snapshot = None
+        self.__executor = None
+        self.__block = None
+        self.__futures = []
+        self.__retired = []
+        self.__size = 0
+        self.__snapshot_id = 0
+        if self.workers and shared_memory is None:
+            debug_write("Shared memory is not available, evaluating candidates without worker processes")
+            self.workers = 0
+        if self.workers:
+            try:
+                # Workers that share the algo's resource tracker do not report the snapshots they read as leaked when they exit
+                resource_tracker.ensure_running()
+                self.__executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+                # Submitting one task per worker at once makes the executor start every process now
+                for future in [self.__executor.submit(_ready) for _ in range(self.workers)]:
+                    future.result()
+            except (OSError, concurrent.futures.process.BrokenProcessPool) as error:
+                debug_write("Could not start {} worker processes ({}), evaluating candidates without them".format(self.workers, error))
+                self.__shutdown_executor()
+                self.workers = 0
+
+    def set_snapshot(self, snapshot):
+        """Sets the object every evaluation gets, replacing the last one. Call it once per turn.
+
+        Args:
+            snapshot: A picklable object, usually the turn's GameState
+
+        """
+        self.snapshot = snapshot
+        if not self.workers:
+            return
+        data = pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+        self.__retire_block()
+        self.__block = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        self.__block.buf[:len(data)] = data
+        self.__size = len(data)
+        self.__snapshot_id += 1
+
+    def map(self, function, candidates, chunksize=None, timeout=None):
+        """Evaluates every candidate against the snapshot, spreading them over the workers
+
+        Args:
+            function: A top level function called as function(snapshot, candidate)
+            candidates: The candidates to evaluate
+            chunksize: The number of candidates sent to a worker at a time. By default they are split into 4 chunks per worker.
+            timeout: The most seconds to wait for the results, or None to wait for all of them
+
+        Returns:
+            A list of the results in the order of the candidates. The result of a candidate is None if
+            its evaluation raised an exception or did not finish in time.
+        """
+        candidates = list(candidates)
+        if not self.workers:
+            return [self.__evaluate(function, candidate) for candidate in candidates]
+        if self.__block is None:
+            self.set_snapshot(self.snapshot)
+
+        if chunksize is None:
+            chunksize = max(1, -(-len(candidates) // (self.workers * 4)))
+        futures = {}
+        for start in range(0, len(candidates), chunksize):
+            future = self.__executor.submit(_evaluate_chunk, self.__snapshot_id, self.__block.name, self.__size,
+                                            function, candidates[start:start + chunksize])
+            futures[future] = start
+        # Remembered until they finish, so the snapshot they read is not freed under them
+        self.__futures = [future for future in self.__futures if not future.done()]
+        self.__futures.extend(futures)
+
+        results = [None] * len(candidates)
+        try:
+            for future in concurrent.futures.as_completed(futures, timeout=timeout):
+                start = futures[future]
+                try:
+                    chunk = future.result()
+                except Exception as error:
+                    debug_write("Evaluating candidates {} to {} raised {}: {}".format(
+                        start, start + chunksize - 1, type(error).__name__, error))
+                    continue
+                results[start:start + len(chunk)] = chunk
+        except concurrent.futures.TimeoutError:
+            debug_write("Candidate evaluation did not finish within {} seconds".format(timeout))
+            for future in futures:
+                future.cancel()
+        return results
+
+    def __evaluate(self, function, candidate):
+        try:
+            return function(self.snapshot, candidate)
+        except Exception as error:
+            debug_write("Evaluating candidate {} raised {}: {}".format(candidate, type(error).__name__, error))
+            return None
+
+    def shutdown(self):
+        """Stops the worker processes and frees the shared memory. Called by AlgoCore when the game ends. 
+        Chunks that have not started are cancelled, and the ones already running are waited for.
+        """
+        self.__shutdown_executor(wait=True)
+        self.__retire_block()
+        self.workers = 0
+
+    def __shutdown_executor(self, wait=False):
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=wait, cancel_futures=True)
+            self.__executor = None
+
+    def __retire_block(self):
+        """Stops using the current shared memory block, freeing it once no chunk can still be reading it, 
+        and frees the earlier blocks whose chunks have all finished
+        """
+        if self.__block is not None:
+            running = [future for future in self.__futures if not future.cancel() and not future.done()]
+            self.__retired.append((self.__block, running))
+            self.__block = None
+            self.__futures = []
+        retired = []
+        for block, futures in self.__retired:
+            if all(future.done() for future in futures):
+                block.close()
+                block.unlink()
+            else:
+                retired.append((block, futures))
+        self.__retired = retired
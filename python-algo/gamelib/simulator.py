@@ -0,0 +1,581 @@
+"""
+Forward simulation of the action phase.
+
+simulate() plays out an action phase on a clone of a GameState, frame by frame, using the unit stats
+in the config and the same pathing and targeting GameState uses. Each frame follows the order the
+engine documents:
+
+    1. Information units take a step if it is time for them to move. A unit that reaches its target
+       edge breaches, and a unit with nowhere left to go self destructs.
+    2. Encryptors shield friendly information units in range that they have not shielded yet.
+    3. Every unit that can attack hits the target get_target picks for it.
+    4. Units with 0 or less health are removed. If a firewall was destroyed, every information unit
+       finds a new path from where it is.
+
+The order of events within each step is not documented, simulate() lists what it assumes. 
+compare_with_replay() checks the simulation against the frames of a replay file.
+
+simulate_batch() scores many candidate deploys at once, advancing them all together frame by frame
+with NumPy when it is installed. It trades some accuracy for speed, see its documentation.
+"""
+from .unit import GameUnit, get_unit_stats
+from .util import debug_write
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class SimulationResult:
+    """What happened during a simulated action phase
+
+    Attributes :
+        * frames (int): The number of frames simulated
+        * breaches (list): (location, player_index, damage) for every unit that reached its target edge.
+          player_index is the owner of the unit that scored.
+        * deaths (list): (unit_type, location, player_index, frame) for every unit that was destroyed or self destructed
+        * self_destructs (list): (location, player_index, frame) for every unit that self destructed
+        * damage_dealt (list): Total damage dealt by each player's units, indexed by player_index
+        * health (list): Each player's health at the end of the action phase, indexed by player_index
+        * resources (list): Each player's resources at the end, as {'cores': x, 'bits': y} dicts indexed by player_index
+        * game_state (GameState): The simulated clone, holding the board as it is after the action phase
+        * frame_units (list): If requested, the units on the board after each frame, see snapshot_units
+
+    """
+    def __init__(self):
+        self.frames = 0
+        self.breaches = []
+        self.deaths = []
+        self.self_destructs = []
+        self.damage_dealt = [0.0, 0.0]
+        self.health = [0.0, 0.0]
+        self.resources = None
+        self.game_state = None
+        self.frame_units = None
+
+    def breach_damage(self, player_index=0):
+        """Gets the damage a player's units did to the opponent's health by breaching
+
+        Args:
+            player_index: The player that scored, 0 for you and 1 for your opponent
+        """
+        return sum(damage for _, owner, damage in self.breaches if owner == player_index)
+
+
+class _Walker:
+    """Simulation state of one information unit
+    """
+    __slots__ = ("unit", "frames_per_move", "target_edge", "end_points", "path", "step", "moves", "shielded_by")
+
+    def __init__(self, unit, game_state, edges):
+        self.unit = unit
+        self.frames_per_move = max(1, int(round(1 / unit.speed))) if unit.speed > 0 else 0
+        self.target_edge = game_state.get_target_edge([unit.x, unit.y])
+        self.end_points = edges[self.target_edge]
+        self.path = None
+        self.step = 0
+        self.moves = 0
+        self.shielded_by = set()
+
+    def find_path(self, game_state):
+        self.path = game_state.find_path_to_edge([self.unit.x, self.unit.y], self.target_edge) or [[self.unit.x, self.unit.y]]
+        self.step = 0
+
+
+def _mobile_stats(config):
+    """Gets the breach and self destruct stats of every information unit type, which GameUnit does not hold
+    """
+    cores_for_damage = config.get("resources", {}).get("coresForPlayerDamage", 0)
+    stats = {}
+    for type_config in config["unitInformation"]:
+        if type_config.get("unitCategory") != 1:
+            continue
+        breach_damage = type_config.get("playerBreachDamage", 1.0)
+        stats[type_config["shorthand"]] = (
+            breach_damage,
+            type_config.get("metalForBreach", cores_for_damage * breach_damage),
+            type_config.get("selfDestructRange", 0),
+            type_config.get("selfDestructDamageWalker", 0),
+            type_config.get("selfDestructDamageTower", 0),
+            type_config.get("selfDestructStepsRequired", 0))
+    return stats
+
+def _may_retarget(attacker, target, damaged):
+    """Checks whether a unit damaged since the targets were found may now be a better target for attacker than target. 
+    Losing health only makes a unit a better target, so only damaged enemy units close enough to be in range matter.
+    """
+    reach = (attacker.attackRange + 1) ** 2
+    for unit in damaged:
+        if unit is not target and unit.player_index != attacker.player_index \
+                and (unit.x - attacker.x) ** 2 + (unit.y - attacker.y) ** 2 < reach:
+            return True
+    return False
+
+def snapshot_units(game_state):
+    """Gets every unit on the board in a form that can be compared between frames and with replays
+
+    Returns:
+        A sorted list of (player_index, unit_type, x, y, health) tuples, with health rounded to one decimal
+    """
+    units = []
+    for x, y in game_state.game_map.iter_occupied():
+        for unit in game_state.game_map[x, y]:
+            units.append((unit.player_index, unit.unit_type, x, y, round(unit.health, 1)))
+    units.sort()
+    return units
+
+def simulate(game_state, my_deploys=None, enemy_deploys=None, max_frames=1000, record_frames=False):
+    """Simulates the action phase that follows the current deploy phase.
+
+    The information units already on the map take part, including the ones placed with attempt_spawn,
+    along with any deploys passed in. game_state itself is not changed.
+
+    Where the engine's documentation leaves the order of events within a frame open, it assumes the following. 
+    These assumptions have only been checked with hand built boards, not with engine replays, 
+    use compare_with_replay to check them against your own replays:
+        * Attackers act one at a time, information units first and then firewalls, each in the order of their locations, 
+          y first then x. An attacker brought to 0 or less health earlier in the same frame does not attack.
+        * Units at 0 or less health stay on the board until the end of the frame, so they can still be targeted, 
+          and as the units with the least health they draw the attacks of every attacker that picks them.
+        * A self destruct only damages units that still have more than 0 health.
+
+    Args:
+        game_state: The GameState to start from
+        my_deploys: Extra information units for you, as a list of (unit_type, x, y) like GameState._deploy_stack
+        enemy_deploys: Information units for your opponent, in the same form
+        max_frames: The most frames to simulate
+        record_frames: If true, keep snapshot_units of the board after every frame in the result
+
+    Returns:
+        A SimulationResult
+    """
+    state = game_state.clone()
+    state.suppress_warnings(True)
+    game_map = state.game_map
+    config = state.config
+    mobile_stats = _mobile_stats(config)
+    result = SimulationResult()
+    if record_frames:
+        result.frame_units = []
+
+    edges = [set((x, y) for x, y in edge) for edge in game_map.get_edges()]
+
+    # Units are damaged and moved in place, so every occupied location gets its own copy of its units first
+    walkers = []
+    firewalls = []
+    for x, y in list(game_map.iter_occupied()):
+        for unit in game_map._owned_units(x, y):
+            if unit.stationary:
+                firewalls.append(unit)
+            else:
+                walkers.append(_Walker(unit, state, edges))
+    for player_index, deploys in ((0, my_deploys), (1, enemy_deploys)):
+        for unit_type, x, y in deploys or ():
+            cost = state.type_cost(unit_type)
+            resources = dict(state._player_resources[player_index])
+            resources['cores'] -= cost[state.CORES]
+            resources['bits'] -= cost[state.BITS]
+            state._player_resources[player_index] = resources
+            unit = GameUnit(unit_type, config, player_index, None, x, y)
+            game_map._place_unit(unit)
+            walkers.append(_Walker(unit, state, edges))
+    for walker in walkers:
+        walker.find_path(state)
+    health = [state.my_health, state.enemy_health]
+    encryptors = [unit for unit in firewalls if unit.shieldPerUnit > 0 and unit.shieldRange > 0]
+
+    frame = 0
+    while walkers and frame < max_frames:
+        frame += 1
+        removed = []
+        damaged_firewalls = []
+
+        # 1. Movement, breaches and self destructs
+        for walker in walkers:
+            unit = walker.unit
+            if not walker.frames_per_move or frame % walker.frames_per_move:
+                continue
+            if walker.step + 1 < len(walker.path):
+                walker.step += 1
+                walker.moves += 1
+                x, y = walker.path[walker.step]
+                game_map._take_unit(unit)
+                unit.x, unit.y = x, y
+                game_map._place_unit(unit)
+                if walker.step + 1 == len(walker.path) and (x, y) in walker.end_points:
+                    breach_damage, cores, _, _, _, _ = mobile_stats[unit.unit_type]
+                    health[1 - unit.player_index] -= breach_damage
+                    resources = dict(state._player_resources[unit.player_index])
+                    resources['cores'] += cores
+                    state._player_resources[unit.player_index] = resources
+                    result.breaches.append(([x, y], unit.player_index, breach_damage))
+                    removed.append(walker)
+                continue
+            # Nowhere left to go, so the unit self destructs
+            _, _, destruct_range, damage_walker, damage_tower, steps_required = mobile_stats[unit.unit_type]
+            if walker.moves >= steps_required:
+                for location in game_map.get_cached_locations_in_range([unit.x, unit.y], destruct_range):
+                    for target in game_map[location]:
+                        if target.player_index != unit.player_index and target.health > 0:
+                            damage = damage_tower if target.stationary else damage_walker
+                            target.health -= damage
+                            result.damage_dealt[unit.player_index] += damage
+                            if target.stationary:
+                                damaged_firewalls.append(target)
+            result.self_destructs.append(([unit.x, unit.y], unit.player_index, frame))
+            unit.health = 0
+            removed.append(walker)
+        for walker in removed:
+            game_map._take_unit(walker.unit)
+            if walker.unit.health <= 0:
+                result.deaths.append((walker.unit.unit_type, [walker.unit.x, walker.unit.y], walker.unit.player_index, frame))
+        if removed:
+            removed = set(removed)
+            walkers = [walker for walker in walkers if walker not in removed]
+
+        # 2. Shielding
+        for encryptor in encryptors:
+            if encryptor.health <= 0:
+                continue
+            shield_range = game_map.get_cached_locations_in_range([encryptor.x, encryptor.y], encryptor.shieldRange)
+            for walker in walkers:
+                unit = walker.unit
+                if unit.player_index == encryptor.player_index and id(encryptor) not in walker.shielded_by \
+                        and (unit.x, unit.y) in shield_range:
+                    unit.health += encryptor.shieldPerUnit
+                    walker.shielded_by.add(id(encryptor))
+
+        # 3. Attacks. Targets are found for every attacker at once, then an attacker only looks for its target again 
+        # if a unit damaged earlier in the frame could have become a better target for it.
+        attackers = [unit for unit in [walker.unit for walker in walkers] + firewalls
+                     if unit.attackRange > 0 and (unit.damage_f > 0 or unit.damage_i > 0)]
+        damaged = []
+        for attacker, target in zip(attackers, state.get_targets(attackers)):
+            if attacker.health <= 0:
+                continue
+            if damaged and _may_retarget(attacker, target, damaged):
+                target = state.get_target(attacker)
+            if target is None:
+                continue
+            damage = attacker.damage_f if target.stationary else attacker.damage_i
+            target.health -= damage
+            damaged.append(target)
+            result.damage_dealt[attacker.player_index] += damage
+            if target.stationary:
+                damaged_firewalls.append(target)
+
+        # 4. Removing destroyed units
+        walls_changed = False
+        for unit in dict.fromkeys(damaged_firewalls):
+            if unit.health <= 0:
+                game_map._take_unit(unit)
+                result.deaths.append((unit.unit_type, [unit.x, unit.y], unit.player_index, frame))
+                walls_changed = True
+            else:
+                game_map._sync_location(unit.x, unit.y)
+        if walls_changed:
+            firewalls = [unit for unit in firewalls if unit.health > 0]
+            encryptors = [unit for unit in encryptors if unit.health > 0]
+        survivors = []
+        for walker in walkers:
+            if walker.unit.health <= 0:
+                game_map._take_unit(walker.unit)
+                result.deaths.append((walker.unit.unit_type, [walker.unit.x, walker.unit.y], walker.unit.player_index, frame))
+            else:
+                survivors.append(walker)
+                if walls_changed:
+                    walker.find_path(state)
+        walkers = survivors
+
+        if record_frames:
+            result.frame_units.append(snapshot_units(state))
+
+    state.my_health, state.enemy_health = health
+    result.frames = frame
+    result.health = health
+    result.resources = [dict(resources) for resources in state._player_resources]
+    result.game_state = state
+    return result
+
+def compare_with_replay(config, replay_lines, max_mismatches=10):
+    """Checks the simulator frame by frame against the action phases of a replay.
+
+    Each action phase is simulated from its first frame, and the units on the board after every
+    simulated frame are compared with the units in the replay's next frames.
+
+    Args:
+        config: The config the replay was played with
+        replay_lines: The lines of a replay file. The config line and any line that is not an action frame are skipped.
+        max_mismatches: Stop after finding this many frames that do not match
+
+    Returns:
+        A list of (turn number, frame number, units only in the replay, units only in the simulation)
+        for every frame that did not match, where units are in the form returned by snapshot_units
+    """
+    from .game_state import GameState
+    from . import codec
+
+    phases = []
+    for line in replay_lines:
+        line = line.strip()
+        if not line or "turnInfo" not in line:
+            continue
+        frame = codec.loads(line)
+        if int(frame["turnInfo"][0]) != 1:
+            continue
+        if int(frame["turnInfo"][2]) == 0 or not phases:
+            phases.append([])
+        phases[-1].append(frame)
+
+    mismatches = []
+    for frames in phases:
+        start = GameState(config, frames[0])
+        start.suppress_warnings(True)
+        simulated = simulate(start, max_frames=len(frames) - 1, record_frames=True)
+        for actual, units in zip(frames[1:], simulated.frame_units):
+            expected = snapshot_units(GameState(config, actual))
+            if expected != units:
+                expected_set, units_set = set(expected), set(units)
+                mismatches.append((int(actual["turnInfo"][1]), int(actual["turnInfo"][2]),
+                                   sorted(expected_set - units_set), sorted(units_set - expected_set)))
+                if len(mismatches) >= max_mismatches:
+                    debug_write("Stopped comparing with the replay after {} mismatched frames".format(max_mismatches))
+                    return mismatches
+    return mismatches
+
+class BatchResult:
+    """Scores of the candidates given to simulate_batch, every list is in the order of the candidates
+
+    Attributes :
+        * scores (list): breach_weight * breach_damage + damage_weight * firewall_damage for each candidate
+        * breach_damage (list): The damage each candidate did to the opponent's health by breaching
+        * firewall_damage (list): The damage each candidate did to enemy firewalls, including self destructs
+        * units_lost (list): The number of units of each candidate that did not breach
+        * frames (int): The number of frames simulated
+
+    """
+    def __init__(self, scores, breach_damage, firewall_damage, units_lost, frames):
+        self.scores = scores
+        self.breach_damage = breach_damage
+        self.firewall_damage = firewall_damage
+        self.units_lost = units_lost
+        self.frames = frames
+
+    def best(self):
+        """Gets the index of the candidate with the highest score, preferring fewer units lost on a tie, or None if there are no candidates
+        """
+        if not self.scores:
+            return None
+        return max(range(len(self.scores)), key=lambda index: (self.scores[index], -self.units_lost[index], -index))
+
+
+class _Lane:
+    """What is static about a unit type spawned at a location, shared by every candidate that deploys it there
+    """
+    __slots__ = ("tiles", "frames_per_move", "max_health", "breach", "breach_damage", "self_destruct_damage", "shield", "attack_damage")
+
+def _build_lane(state, player_index, unit_type, x, y, mobile_stats, shielders, edges):
+    game_map = state.game_map
+    size = game_map.ARENA_SIZE
+    stats = get_unit_stats(state.config, unit_type)
+    breach_damage, _, destruct_range, _, damage_tower, steps_required = mobile_stats[unit_type]
+    target_edge = state.get_target_edge([x, y])
+    path = state.find_path_to_edge([x, y], target_edge) or [[x, y]]
+    owners = game_map.stationary_owner
+    enemy = 1 - player_index
+
+    lane = _Lane()
+    lane.tiles = [i * size + j for i, j in path]
+    # Like _Walker, 0 means the unit never moves
+    lane.frames_per_move = max(1, int(round(1 / stats.speed))) if stats.speed > 0 else 0
+    lane.max_health = stats.max_health
+    lane.breach = len(path) > 1 and tuple(path[-1]) in edges[target_edge]
+    lane.breach_damage = breach_damage
+    lane.self_destruct_damage = 0.0
+    if not lane.breach and len(path) - 1 >= steps_required:
+        targets = sum(1 for i, j in game_map.get_cached_locations_in_range(path[-1], destruct_range) if owners[i * size + j] == enemy)
+        lane.self_destruct_damage = damage_tower * targets
+
+    # Shielding happens after moving, so a unit that moves every frame is never shielded on its spawn location
+    lane.shield = [0.0] * len(path)
+    shielded = set()
+    for step, (i, j) in enumerate(path):
+        if step == 0 and lane.frames_per_move == 1:
+            continue
+        for shielder, (shield_range, shield) in enumerate(shielders):
+            if shielder not in shielded and (i, j) in shield_range:
+                shielded.add(shielder)
+                lane.shield[step] += shield
+
+    lane.attack_damage = [0.0] * len(path)
+    if stats.damage_f > 0 and stats.attackRange > 0:
+        for step, (i, j) in enumerate(path):
+            if any(owners[a * size + b] == enemy for a, b in game_map.get_cached_locations_in_range([i, j], stats.attackRange)):
+                lane.attack_damage[step] = stats.damage_f
+    return lane
+
+def _run_batch_python(lanes, groups, candidate_count, damage, max_frames):
+    breach_damage = [0.0] * candidate_count
+    firewall_damage = [0.0] * candidate_count
+    units_lost = [0] * candidate_count
+    # Each group is [lane, candidate, count, step, front health, health of the units behind the front one]
+    active = []
+    for lane_index, candidate, count in groups:
+        lane = lanes[lane_index]
+        active.append([lane, candidate, count, 0, lane.max_health + lane.shield[0], lane.max_health + lane.shield[0]])
+
+    frame = 0
+    while active and frame < max_frames:
+        frame += 1
+        survivors = []
+        for group in active:
+            lane, candidate, count, step, front, behind = group
+            if lane.frames_per_move and frame % lane.frames_per_move == 0:
+                if step + 1 < len(lane.tiles):
+                    step += 1
+                    front += lane.shield[step]
+                    behind += lane.shield[step]
+                    if step + 1 == len(lane.tiles) and lane.breach:
+                        breach_damage[candidate] += count * lane.breach_damage
+                        continue
+                else:
+                    firewall_damage[candidate] += count * lane.self_destruct_damage
+                    units_lost[candidate] += count
+                    continue
+            firewall_damage[candidate] += count * lane.attack_damage[step]
+            # Every firewall in range targets the same unit, the one with the lowest health, so at most one unit dies per frame
+            front -= damage[lane.tiles[step]]
+            if front <= 0:
+                count -= 1
+                units_lost[candidate] += 1
+                front = behind
+                if count == 0:
+                    continue
+            group[2:] = count, step, front, behind
+            survivors.append(group)
+        active = survivors
+    for group in active:
+        units_lost[group[1]] += group[2]
+    return breach_damage, firewall_damage, units_lost, frame
+
+def _run_batch_numpy(lanes, groups, candidate_count, damage, max_frames):
+    length = max(len(lane.tiles) for lane in lanes)
+    lane_count = len(lanes)
+    tiles = np.zeros((lane_count, length), dtype=np.int64)
+    shield = np.zeros((lane_count, length))
+    attack_damage = np.zeros((lane_count, length))
+    for index, lane in enumerate(lanes):
+        tiles[index, :len(lane.tiles)] = lane.tiles
+        shield[index, :len(lane.tiles)] = lane.shield
+        attack_damage[index, :len(lane.tiles)] = lane.attack_damage
+    lane_length = np.array([len(lane.tiles) for lane in lanes], dtype=np.int64)
+    frames_per_move = np.array([lane.frames_per_move for lane in lanes], dtype=np.int64)
+    max_health = np.array([lane.max_health for lane in lanes])
+    breaches = np.array([lane.breach for lane in lanes], dtype=bool)
+    breach_value = np.array([lane.breach_damage for lane in lanes])
+    self_destruct_value = np.array([lane.self_destruct_damage for lane in lanes])
+    damage = np.frombuffer(damage, dtype=np.float64)
+
+    lane = np.array([group[0] for group in groups], dtype=np.int64)
+    candidate = np.array([group[1] for group in groups], dtype=np.int64)
+    count = np.array([group[2] for group in groups], dtype=np.int64)
+    step = np.zeros(len(groups), dtype=np.int64)
+    behind = max_health[lane] + shield[lane, 0]
+    front = behind.copy()
+    group_breach = np.zeros(len(groups))
+    group_firewall = np.zeros(len(groups))
+    group_lost = np.zeros(len(groups), dtype=np.int64)
+    active = count > 0
+
+    frame = 0
+    while frame < max_frames and active.any():
+        frame += 1
+        moving = active & (frames_per_move[lane] > 0) & (frame % np.maximum(frames_per_move[lane], 1) == 0)
+        stepping = moving & (step + 1 < lane_length[lane])
+        destructing = moving & ~stepping
+        step += stepping
+        gained = np.where(stepping, shield[lane, step], 0.0)
+        front += gained
+        behind += gained
+
+        breaching = stepping & (step + 1 == lane_length[lane]) & breaches[lane]
+        group_breach += np.where(breaching, count * breach_value[lane], 0.0)
+        group_firewall += np.where(destructing, count * self_destruct_value[lane], 0.0)
+        group_lost += np.where(destructing, count, 0)
+        active &= ~(breaching | destructing)
+
+        group_firewall += np.where(active, count * attack_damage[lane, step], 0.0)
+        front -= np.where(active, damage[tiles[lane, step]], 0.0)
+        died = active & (front <= 0)
+        count -= died
+        group_lost += died
+        front = np.where(died, behind, front)
+        active &= count > 0
+    group_lost += np.where(active, count, 0)
+
+    return (np.bincount(candidate, group_breach, candidate_count).tolist(),
+            np.bincount(candidate, group_firewall, candidate_count).tolist(),
+            np.bincount(candidate, group_lost, candidate_count).astype(np.int64).tolist(),
+            frame)
+
+def simulate_batch(game_state, candidates, player_index=0, breach_weight=1.0, damage_weight=0.01, max_frames=1000, use_numpy=True):
+    """Scores many candidate deploys against the same board, for comparing options much faster than calling simulate for each one.
+
+    Everything that only depends on the firewalls is worked out once and shared by every candidate:
+    the path from each spawn location, the damage enemy firewalls deal at each location, and which
+    friendly encryptors shield each path. Units of the same type spawned at the same location move
+    together, and all the candidates are then advanced together one frame at a time.
+
+    This is faster than simulate because it makes these simplifications:
+        * Firewalls are never destroyed, so paths never change
+        * Only the candidate's units take part, not the units already on the map
+        * Each group of units is attacked as if it were the only one in range, so groups do not share enemy fire
+    Within those simplifications it follows the same rules as simulate, including every firewall in range 
+    attacking the same unit of a group, so a group loses at most one unit per frame.
+
+    Args:
+        game_state: The GameState to start from, it is not changed
+        candidates: A list of deploys, each a list of (unit_type, x, y) like GameState._deploy_stack
+        player_index: The player deploying the candidates, 0 for you and 1 for your opponent
+        breach_weight: The score of each point of damage done by breaching
+        damage_weight: The score of each point of damage done to enemy firewalls
+        max_frames: The most frames to simulate
+        use_numpy: Advance the candidates with NumPy arrays. Ignored if NumPy is not installed.
+
+    Returns:
+        A BatchResult
+    """
+    state = game_state.clone()
+    state.suppress_warnings(True)
+    game_map = state.game_map
+    mobile_stats = _mobile_stats(state.config)
+    edges = [set((x, y) for x, y in edge) for edge in game_map.get_edges()]
+    shielders = []
+    for x, y in game_map.iter_occupied():
+        for unit in game_map[x, y]:
+            if unit.stationary and unit.player_index == player_index and unit.shieldPerUnit > 0 and unit.shieldRange > 0:
+                shielders.append((game_map.get_cached_locations_in_range([x, y], unit.shieldRange), unit.shieldPerUnit))
+
+    lanes = []
+    lane_indices = {}
+    groups = []
+    for candidate, deploys in enumerate(candidates):
+        counts = {}
+        for unit_type, x, y in deploys:
+            key = (unit_type, x, y)
+            if key not in lane_indices:
+                lane_indices[key] = len(lanes)
+                lanes.append(_build_lane(state, player_index, unit_type, x, y, mobile_stats, shielders, edges))
+            counts[lane_indices[key]] = counts.get(lane_indices[key], 0) + 1
+        for lane_index, count in counts.items():
+            groups.append((lane_index, candidate, count))
+
+    damage = game_map.get_coverage().damage[1 - player_index]
+    if not groups:
+        breach_damage, firewall_damage, units_lost, frames = [0.0] * len(candidates), [0.0] * len(candidates), [0] * len(candidates), 0
+    elif use_numpy and np is not None:
+        breach_damage, firewall_damage, units_lost, frames = _run_batch_numpy(lanes, groups, len(candidates), damage, max_frames)
+    else:
+        breach_damage, firewall_damage, units_lost, frames = _run_batch_python(lanes, groups, len(candidates), damage, max_frames)
+    scores = [breach_weight * breached + damage_weight * dealt for breached, dealt in zip(breach_damage, firewall_damage)]
+    return BatchResult(scores, breach_damage, firewall_damage, units_lost, frames)
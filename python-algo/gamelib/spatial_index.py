@@ -0,0 +1,135 @@
+from array import array
+
+class SpatialIndex:
+    """Holds where each player's firewalls of each type are, so counting them never scans the board.
+
+    For every player index and firewall type the index keeps the set of locations, and how many
+    of those firewalls are in each row and each column. Using None as the type gives the same for all
+    of a player's firewalls. It is built from a GameMap's per-cell arrays the first time it is requested,
+    then the GameMap that owns it adds or removes single firewalls as they change, like the CoverageMap.
+
+    Attributes :
+        * game_map (:obj: GameMap): The map whose firewalls are indexed
+        * ARENA_SIZE (int): The size of the arena
+        * locations (dict): (player_index, type_index or None) to the set of (x, y) of those firewalls
+        * row_counts (dict): (player_index, type_index or None) to an array holding the number of those firewalls in each row
+        * column_counts (dict): (player_index, type_index or None) to an array holding the number of those firewalls in each column
+
+    """
+    def __init__(self, game_map):
+        """Indexes every firewall currently on game_map
+
+        Args:
+            game_map: The GameMap to index
+
+        """
+        self.game_map = game_map
+        self.ARENA_SIZE = game_map.ARENA_SIZE
+        self.locations = {}
+        self.row_counts = {}
+        self.column_counts = {}
+        self.__type_index = {}
+        for index, unit_information in enumerate(game_map.config["unitInformation"]):
+            self.__type_index[unit_information.get("shorthand")] = index
+
+        stationary_owner = game_map.stationary_owner
+        for index, owner in enumerate(stationary_owner):
+            if owner >= 0:
+                x, y = divmod(index, self.ARENA_SIZE)
+                self.add_firewall(x, y, owner, game_map.stationary_type[index], game_map.stationary_upgraded[index])
+
+    def copy(self, game_map):
+        """Copies the index for a clone of its GameMap
+
+        Args:
+            game_map: The GameMap the copy will belong to, which must hold the same firewalls
+
+        Returns:
+            A new SpatialIndex with the same values
+        """
+        index = SpatialIndex.__new__(SpatialIndex)
+        index.game_map = game_map
+        index.ARENA_SIZE = self.ARENA_SIZE
+        index.locations = {key: set(locations) for key, locations in self.locations.items()}
+        index.row_counts = {key: counts[:] for key, counts in self.row_counts.items()}
+        index.column_counts = {key: counts[:] for key, counts in self.column_counts.items()}
+        index.__type_index = self.__type_index
+        return index
+
+    def __update(self, key, x, y, sign):
+        locations = self.locations.get(key)
+        if locations is None:
+            locations = self.locations[key] = set()
+            self.row_counts[key] = array('i', [0]) * self.ARENA_SIZE
+            self.column_counts[key] = array('i', [0]) * self.ARENA_SIZE
+        if sign > 0:
+            locations.add((x, y))
+        else:
+            locations.discard((x, y))
+        self.row_counts[key][y] += sign
+        self.column_counts[key][x] += sign
+
+    def add_firewall(self, x, y, owner, type_index, upgraded):
+        """Adds a firewall to the index
+
+        Args:
+            x, y: The location of the firewall
+            owner: The player index of the firewall
+            type_index: The index of the firewall's type in config["unitInformation"]
+            upgraded: True if the firewall is upgraded, which the index does not track
+
+        """
+        self.__update((owner, type_index), x, y, 1)
+        self.__update((owner, None), x, y, 1)
+
+    def remove_firewall(self, x, y, owner, type_index, upgraded):
+        """Removes a firewall from the index. Takes the same arguments as add_firewall
+        """
+        self.__update((owner, type_index), x, y, -1)
+        self.__update((owner, None), x, y, -1)
+
+    def __key(self, player_index, unit_type):
+        return (player_index, None if unit_type is None else self.__type_index.get(unit_type, -1))
+
+    def get_locations(self, player_index, unit_type=None):
+        """Gets the locations of a player's firewalls
+
+        Args:
+            player_index: The owner of the firewalls, 0 for you and 1 for your opponent
+            unit_type: Only get firewalls of this type, or None for all of them
+
+        Returns:
+            A set of (x, y) tuples. It is shared with the index, so it must not be changed.
+        """
+        return self.locations.get(self.__key(player_index, unit_type), set())
+
+    def count(self, player_index, unit_type=None, valid_x=None, valid_y=None):
+        """Counts a player's firewalls, optionally only those of one type in some columns and rows.
+        Counting in rows or columns alone only adds up the per-row or per-column counts.
+
+        Args:
+            player_index: The owner of the firewalls, 0 for you and 1 for your opponent
+            unit_type: Only count firewalls of this type, or None for all of them
+            valid_x: Only count firewalls in these columns, or None for every column
+            valid_y: Only count firewalls in these rows, or None for every row
+
+        Returns:
+            The number of matching firewalls
+        """
+        key = self.__key(player_index, unit_type)
+        locations = self.locations.get(key)
+        if not locations:
+            return 0
+        if valid_x is None and valid_y is None:
+            return len(locations)
+        if valid_x is None:
+            counts = self.row_counts[key]
+            return sum(counts[y] for y in set(valid_y) if 0 <= y < self.ARENA_SIZE)
+        if valid_y is None:
+            counts = self.column_counts[key]
+            return sum(counts[x] for x in set(valid_x) if 0 <= x < self.ARENA_SIZE)
+        valid_x = set(valid_x)
+        valid_y = set(valid_y)
+        if len(valid_x) * len(valid_y) < len(locations):
+            return sum(1 for x in valid_x for y in valid_y if (x, y) in locations)
+        return sum(1 for x, y in locations if x in valid_x and y in valid_y)
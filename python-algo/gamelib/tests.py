@@ -1,10 +1,81 @@
 import unittest
+import unittest.mock
+import io
 import json
+import multiprocessing
+import threading
 from .game_state import GameState
-from .unit import GameUnit
+from .unit import GameUnit, get_unit_stats
+from .game_map import ARENA_LOCATIONS, LOCATION_INDEX
+from .cache import LRUCache
+from .coverage import CoverageMap
+from .spatial_index import SpatialIndex
+from . import navigation
+from . import codec
+from . import util
+from .algocore import AlgoCore
+from .budget import TurnBudget
+from .background import BackgroundTask
+from . import simulator
+from .parallel import WorkerPool, shared_memory
+
+CURRENT_CONFIG = """
+{
+    "unitInformation":[
+        {"cost1":1.0, "getHitRadius":0.01, "display":"Filter", "shorthand":"FF", "startHealth":60.0, "unitCategory":0,
+            "upgrade":{"startHealth":120.0}},
+        {"cost1":4.0, "getHitRadius":0.01, "shieldPerUnit":3.0, "display":"Encryptor", "shieldRange":3.5, "shorthand":"EF",
+            "startHealth":30.0, "unitCategory":0, "upgrade":{"shieldRange":7, "shieldPerUnit":4}},
+        {"attackDamageWalker":16.0, "cost1":6.0, "getHitRadius":0.01, "display":"Destructor", "attackRange":3.5, "shorthand":"DF",
+            "startHealth":75.0, "unitCategory":0, "upgrade":{"attackDamageWalker":32.0}},
+        {"attackDamageTower":2.0, "attackDamageWalker":2.0, "playerBreachDamage":1.0, "cost2":1.0, "getHitRadius":0.01,
+            "display":"Ping", "attackRange":3.5, "shorthand":"PI", "startHealth":15.0, "speed":1, "unitCategory":1,
+            "selfDestructDamageWalker":15.0, "selfDestructDamageTower":15.0, "metalForBreach":1.0,
+            "selfDestructRange":1.5, "selfDestructStepsRequired":5},
+        {"attackDamageWalker":8.0, "attackDamageTower":8.0, "playerBreachDamage":1.0, "cost2":3.0, "getHitRadius":0.01,
+            "display":"EMP", "attackRange":4.5, "shorthand":"EI", "startHealth":5.0, "speed":0.5, "unitCategory":1,
+            "selfDestructDamageWalker":5.0, "selfDestructDamageTower":5.0, "metalForBreach":1.0,
+            "selfDestructRange":1.5, "selfDestructStepsRequired":5},
+        {"attackDamageWalker":20.0, "playerBreachDamage":1.0, "cost2":1.0, "getHitRadius":0.01, "display":"Scrambler",
+            "attackRange":4.5, "shorthand":"SI", "startHealth":40.0, "speed":0.25, "unitCategory":1,
+            "selfDestructDamageWalker":40.0, "selfDestructDamageTower":40.0, "metalForBreach":1.0,
+            "selfDestructRange":1.5, "selfDestructStepsRequired":5},
+        {"display":"Remove", "shorthand":"RM"},
+        {"display":"Upgrade", "shorthand":"UP"}
+    ],
+    "timingAndReplay":{"waitTimeBotMax":35000, "waitTimeBotSoft":5000, "replaySave":1},
+    "resources":{"turnIntervalForBitSchedule":10, "bitGrowthRate":1.0, "startingHP":30.0, "maxBits":150.0,
+        "bitsPerRound":5.0, "coresPerRound":5.0, "startingBits":5.0, "bitDecayPerRound":0.25, "startingCores":40.0}
+}
+"""
+
+def path_length(game_state, location):
+    """Evaluates a candidate for test_worker_pool. Worker processes find it by name, so it is not a method
+    """
+    if location is None:
+        raise ValueError("No location")
+    return (location[0], location[1], len(game_state.find_path_to_edge(location)))
+
+def wait_for_event(game_state, event):
+    """Blocks a worker until test_worker_pool sets the event, so its map is sure to time out
+    """
+    event.wait()
+    return game_state.turn_number
 
 class BasicTests(unittest.TestCase):
 
+    def make_current_map(self, p1_units=None, p2_units=None, p1_stats=None, lazy=False):
+        """Builds a turn 0 GameState using the current unit format, with optional unit lists for both players
+        """
+        p1_units = p1_units or [[], [], [], [], [], [], [], []]
+        p2_units = p2_units or [[], [], [], [], [], [], [], []]
+        p1_stats = p1_stats or [30.0, 40.0, 5.0, 0]
+        turn = {"p2Units": p2_units, "turnInfo": [0, 0, -1], "p1Stats": p1_stats, "p1Units": p1_units,
+                "p2Stats": [30.0, 40.0, 5.0, 0], "events": {}}
+        state = GameState(json.loads(CURRENT_CONFIG), json.dumps(turn), lazy=lazy)
+        state.suppress_warnings(True)
+        return state
+
     def make_turn_0_map(self):
         config = """
         {
@@ -232,3 +303,612 @@ class BasicTests(unittest.TestCase):
         actual = game.project_future_bits(turns)
         self.assertAlmostEqual(actual, expected, 0, "Expected {} bits {} turns from now, got {}".format(expected, turns, actual))
 
+    def test_cell_arrays(self):
+        game = self.make_current_map(p2_units=[[[3, 14, 60.0, "1"]], [], [[10, 15, 40.0, "2"]], [], [], [], [], [[10, 15, 0, "3"]]])
+        game_map = game.game_map
+        self.assertEqual(1, game_map.stationary_owner[3 * 28 + 14], "Parsed enemy filter is missing from the owner array")
+        self.assertEqual(2, game_map.stationary_type[10 * 28 + 15], "Parsed destructor has the wrong type index")
+        self.assertEqual(40.0, game_map.stationary_health[10 * 28 + 15], "Parsed destructor has the wrong health")
+        self.assertEqual(1, game_map.stationary_upgraded[10 * 28 + 15], "Parsed upgrade was not recorded")
+
+        game_map.add_unit("PI", [13, 0], 0)
+        game_map.add_unit("PI", [13, 0], 0)
+        self.assertEqual(2, game_map.mobile_count[0][13 * 28], "Information units are not counted")
+        game_map.add_unit("FF", [13, 0], 0)
+        self.assertEqual(0, game_map.stationary_owner[13 * 28], "Adding a firewall did not update the owner array")
+        self.assertEqual(0, game_map.mobile_count[0][13 * 28], "Adding a firewall should replace the units at a location")
+        game_map.remove_unit([13, 0])
+        self.assertEqual(-1, game_map.stationary_owner[13 * 28], "Removing units did not update the owner array")
+        self.assertFalse(game.contains_stationary_unit([13, 0]), "Location should be empty after remove_unit")
+
+    def test_cell_list_changes(self):
+        game = self.make_current_map()
+        path = game.find_path_to_edge([13, 0])
+        clone = game.game_map.clone()
+        wall = GameUnit("FF", game.config, 0, None, path[3][0], path[3][1])
+        game.game_map[path[3]].append(wall)
+        self.assertTrue(game.contains_stationary_unit(path[3]), "Appending to a location should update the arrays")
+        self.assertNotIn(path[3], game.find_path_to_edge([13, 0]), "Paths should avoid walls appended to a location")
+        self.assertFalse(clone.stationary_owner[path[3][0] * 28 + path[3][1]] >= 0, "Clones should not see appended units")
+        game.game_map[path[3]].remove(wall)
+        self.assertFalse(game.contains_stationary_unit(path[3]), "Removing from a location should update the arrays")
+        self.assertEqual(path, game.find_path_to_edge([13, 0]), "Paths should come back once the wall is removed")
+
+    def test_arena_tables(self):
+        game = self.make_current_map()
+        self.assertEqual(420, len(ARENA_LOCATIONS), "The diamond board should have 420 locations")
+        self.assertEqual([list(location) for location in ARENA_LOCATIONS], list(game.game_map), "Precomputed locations should match map iteration")
+        self.assertEqual(0, LOCATION_INDEX[13][0], "The first location should be [13, 0]")
+        self.assertEqual(-1, LOCATION_INDEX[0][0], "Corners are off the board")
+        self.assertFalse(game.game_map.in_arena_bounds([-1, 13]), "Negative coordinates are off the board")
+        self.assertTrue(game.game_map.in_arena_bounds([0, 13]), "The left corner of the diamond is on the board")
+        self.assertFalse(game.game_map.in_arena_bounds([27.5, 13]), "Coordinates past the right corner are off the board")
+        self.assertFalse(game.game_map.in_arena_bounds([-0.5, 13]), "Coordinates past the left corner are off the board")
+        self.assertTrue(game.game_map.in_arena_bounds([13.5, 6.0]), "Non-integer coordinates inside the diamond are on the board")
+
+    def test_map_iteration(self):
+        game = self.make_current_map()
+        game_map = game.game_map
+        pairs = sum(1 for _ in game_map for _ in game_map)
+        self.assertEqual(420 * 420, pairs, "Nested iteration over the map should be independent")
+        self.assertEqual(210, len(list(game_map.iter_my_half())), "Each player should own half of the board")
+        self.assertTrue(all(location[1] >= 14 for location in game_map.iter_enemy_half()), "Enemy half should only hold enemy rows")
+        self.assertEqual([], list(game_map.iter_occupied()), "An empty board has no occupied locations")
+        game_map.add_unit("FF", [13, 13], 0)
+        game_map.add_unit("PI", [20, 6], 1)
+        self.assertEqual([[20, 6], [13, 13]], list(game_map.iter_occupied()), "Occupied locations are missing")
+
+    def test_cached_locations_in_range(self):
+        game = self.make_current_map()
+        game_map = game.game_map
+        cached = game_map.get_cached_locations_in_range([13, 13], 3.5)
+        self.assertIs(cached, game_map.get_cached_locations_in_range([13, 13], 3.5), "Ranges should be memoized")
+        self.assertEqual([list(location) for location in cached], game_map.get_locations_in_range([13, 13], 3.5), "Cached and listed ranges differ")
+        self.assertEqual(37, len(cached), "Wrong number of tiles in range")
+        self.assertEqual(5, len(game_map.get_cached_locations_in_range([13, 0], 1.5)), "Range should be clipped to the board")
+
+    def test_coverage(self):
+        game = self.make_current_map(p2_units=[[], [], [[13, 16, 75.0, "1"]], [], [], [], [], []])
+        self.assertEqual(16, game.get_damage_at([13, 13]), "One destructor should cover this location")
+        self.assertEqual(0, game.get_damage_at([13, 13], 1), "Firewalls should not attack their own units")
+        self.assertEqual(1, len(game.get_attackers([13, 13], 0)), "We should be in danger")
+        game.game_map.add_unit("DF", [14, 14], 1)
+        game.game_map.add_unit("EF", [12, 14], 1)
+        game.game_map.add_unit("DF", [13, 12], 0)
+        self.assertEqual(32, game.get_damage_at([13, 13]), "Added destructors should update the coverage")
+        self.assertEqual(2, len(game.get_attackers([13, 13], 0)), "We should be in danger from 2 places")
+        game.game_map.upgrade_unit([14, 14])
+        game.game_map.remove_unit([13, 16])
+        self.assertEqual(32, game.get_damage_at([13, 13]), "Upgrades and removals should update the coverage")
+        self.assertEqual(0, game.get_damage_at([13, 20]), "Removed destructors should not cover anything")
+
+        fresh = CoverageMap(game.game_map)
+        coverage = game.game_map.get_coverage()
+        self.assertEqual(list(fresh.damage[1]), list(coverage.damage[1]), "Incremental coverage differs from a rebuild")
+        self.assertEqual(list(fresh.attackers[0]), list(coverage.attackers[0]), "Incremental coverage differs from a rebuild")
+        self.assertEqual(3 * 32, game.get_path_damage([[13, 13], [13, 14], [13, 15]]), "Path damage should sum the coverage")
+
+    def test_score_paths(self):
+        game = self.make_current_map(p2_units=[[], [], [[13, 16, 75.0, "1"]], [], [], [], [], []])
+        path = [[13, 13], [13, 14], [13, 15]]
+        for use_numpy in (True, False):
+            score = game.score_paths(path, "PI", use_numpy=use_numpy)
+            self.assertEqual([0, 16, 32], score.cumulative, "Pings should take damage for one frame on each location they move to")
+            self.assertEqual(2, score.frames_in_range, "Every frame of this path is in range")
+            self.assertEqual(1, score.death_index, "A ping should die on the first location it takes damage")
+            self.assertIsNone(game.score_paths(path, "PI", health=60, use_numpy=use_numpy).death_index, "A unit with enough health should survive")
+            scores = game.score_paths([path, [[13, 0], [13, 1]]], "SI", use_numpy=use_numpy)
+            self.assertEqual([48, 112, 176], scores[0].cumulative, "The first location should take one frame less than the others")
+            self.assertEqual(0, scores[0].death_index, "Scores are wrong")
+            self.assertEqual(0, scores[1].damage, "Paths out of range should take no damage")
+
+        game.game_map.add_unit("FF", [13, 0])
+        blocked = game.find_path_to_edge([13, 0])
+        self.assertIsNone(blocked, "Blocked starts should have no path")
+        self.assertIsNone(game.score_paths(blocked, "PI"), "A missing path should have no score")
+        self.assertEqual([], game.score_paths([], "PI"), "No paths should give no scores")
+        scores = game.score_paths([blocked, path], "PI")
+        self.assertIsNone(scores[0], "Missing paths should keep their place in the scores")
+        self.assertEqual(32, scores[1].damage, "Paths after a missing one should still be scored")
+
+    def test_spatial_index(self):
+        game = self.make_current_map(p2_units=[[[13, 16, 60.0, "1"]], [], [[13, 15, 75.0, "2"], [20, 15, 75.0, "3"]], [], [], [], [], []], lazy=True)
+        index = game.game_map.get_spatial_index()
+        self.assertEqual(2, index.count(1, "DF"), "Parsed destructors were not indexed")
+        self.assertEqual(3, index.count(1), "Counting without a type should count every firewall")
+        self.assertEqual(2, index.count(1, "DF", valid_y=[14, 15]), "Row counts are wrong")
+        self.assertEqual(1, index.count(1, "DF", valid_x=range(10, 15), valid_y=[15]), "Counts in an area are wrong")
+        self.assertEqual({(13, 16)}, index.get_locations(1, "FF"), "Locations are wrong")
+
+        clone = game.game_map.clone()
+        checkpoint = game.game_map.checkpoint()
+        game.game_map.remove_unit([13, 15])
+        game.game_map.add_unit("DF", [10, 14], 1)
+        game.game_map.add_unit("DF", [10, 10], 0)
+        self.assertEqual(1, index.count(1, "DF", valid_y=[15]), "Removed firewalls should leave the index")
+        self.assertEqual(1, index.count(0, "DF"), "Added firewalls should join the index")
+        self.assertEqual(2, clone.get_spatial_index().count(1, "DF", valid_y=[15]), "Clones should have their own index")
+        game.game_map.rollback(checkpoint)
+        self.assertEqual(0, index.count(0), "Rollback should restore the index")
+
+        fresh = SpatialIndex(game.game_map)
+        for player_index in (0, 1):
+            self.assertEqual(fresh.get_locations(player_index), index.get_locations(player_index), "Incremental index differs from a rebuild")
+        self.assertEqual(list(fresh.row_counts[(1, None)]), list(index.row_counts[(1, None)]), "Incremental index differs from a rebuild")
+
+    def test_get_targets(self):
+        game = self.make_current_map(
+            p1_units=[[], [], [[13, 11, 75.0, "1"]], [[13, 12, 15.0, "2"]], [], [], [], []],
+            p2_units=[[[12, 14, 60.0, "3"]], [], [[16, 15, 75.0, "4"]], [[13, 14, 15.0, "5"], [13, 14, 9.0, "6"], [14, 14, 9.0, "7"]], [], [], [], []])
+        attackers = [unit for location in game.game_map.iter_occupied() for unit in game.game_map[location]]
+        expected = [game.get_target(attacker) for attacker in attackers]
+        self.assertTrue(any(target is not None for target in expected), "The test board should have targets")
+        for use_numpy in (False, True):
+            targets = game.get_targets(attackers, use_numpy=use_numpy)
+            self.assertEqual(len(attackers), len(targets), "There should be one result per attacker")
+            for attacker, target, scalar in zip(attackers, targets, expected):
+                self.assertIs(scalar, target, "get_targets should match get_target for {}".format(attacker))
+        self.assertEqual([], game.get_targets([]), "No attackers should have no targets")
+
+    def test_incremental_pathing(self):
+        game = self.make_current_map()
+        path = game.find_path_to_edge([3, 10], use_cache=False)
+        self.assertEqual([3, 10], path[0], "Paths should start at the start location")
+        self.assertEqual(path, game.find_path_to_edge([3, 10], use_cache=False), "Repeated searches on the same walls should agree")
+
+        blocker = path[len(path) // 2]
+        game.game_map.add_unit("FF", blocker, 0)
+        rerouted = game.find_path_to_edge([3, 10], use_cache=False)
+        self.assertNotIn(blocker, rerouted, "Paths should avoid newly added walls")
+
+        fresh = self.make_current_map()
+        fresh.game_map.add_unit("FF", blocker, 0)
+        self.assertEqual(fresh.find_path_to_edge([3, 10]), rerouted, "Cached search results should match a fresh search")
+        game.game_map.remove_unit(blocker)
+        self.assertEqual(path, game.find_path_to_edge([3, 10], use_cache=False), "Removing a wall should restore the original path")
+
+    def test_path_cache(self):
+        game = self.make_current_map()
+        cache = navigation.PATH_CACHE
+        cache.clear()
+        path = game.find_path_to_edge([13, 0])
+        cached = game.find_path_to_edge([13, 0])
+        self.assertEqual(path, cached, "Cached paths should match the search")
+        self.assertIsNot(path, cached, "Every lookup should return a new path")
+        self.assertEqual((1, 1), (cache.hits, cache.misses), "The second lookup should hit the cache")
+
+        walls = game.game_map.wall_hash
+        game.game_map.add_unit("FF", path[3])
+        self.assertNotEqual(walls, game.game_map.wall_hash, "Adding a wall should change the wall hash")
+        self.assertEqual(game.find_path_to_edge([13, 0], use_cache=False), game.find_path_to_edge([13, 0]), "Changed walls should not reuse old paths")
+        game.game_map.upgrade_unit(path[3])
+        game.game_map.add_unit("DF", [5, 20], 1)
+        game.game_map.remove_unit([5, 20])
+        game.game_map.remove_unit(path[3])
+        self.assertEqual(walls, game.game_map.wall_hash, "The same walls should give the same wall hash")
+
+        self.assertEqual(path, self.make_current_map().find_path_to_edge([13, 0]), "Paths should be kept across turns")
+        self.assertEqual(2, cache.hits, "A new turn with the same walls should hit the cache")
+        maxsize = cache.maxsize
+        cache.resize(1)
+        self.assertEqual(1, len(cache), "Resizing should evict paths")
+        cache.resize(maxsize)
+
+    def test_paths_from_all_edges(self):
+        game = self.make_current_map()
+        game.game_map.add_unit("FF", [0, 13], 0)
+        game.game_map.add_unit("FF", [3, 10], 0)
+        paths = game.find_paths_from_all_edges()
+        self.assertEqual(26, len(paths), "Blocked edge locations should be skipped")
+        for path in paths:
+            self.assertEqual(game.find_path_to_edge(path[0]), path, "Batched paths should match single paths")
+
+    @unittest.skipIf(navigation.np is None, "NumPy is not installed")
+    def test_numpy_pathing_backend(self):
+        game = self.make_current_map(p2_units=[[[x, 15, 60.0, str(x)] for x in range(2, 24)], [], [], [], [], [], [], []])
+        game.game_map.add_unit("FF", [6, 7], 0)
+        python_paths = game.find_paths_from_all_edges()
+        game._shortest_path_finder = navigation.ShortestPathFinder(navigation.NUMPY_BACKEND)
+        self.assertEqual(navigation.NUMPY_BACKEND, game._shortest_path_finder.backend, "NumPy backend was not selected")
+        self.assertEqual(python_paths, game.find_paths_from_all_edges(), "Backends should find identical paths")
+
+    def test_clone(self):
+        game = self.make_current_map(p1_units=[[], [], [[13, 3, 75.0, "1"]], [], [], [], [], []])
+        path = game.find_path_to_edge([13, 0])
+        damage = game.get_damage_at([13, 6], 1)
+        trial = game.clone()
+        self.assertIs(game.game_map[13, 3][0], trial.game_map[13, 3][0], "Clones should share unchanged units")
+
+        trial.attempt_upgrade([13, 3])
+        trial.attempt_spawn("FF", [[12, 1], [13, 1], [14, 1]])
+        trial.attempt_spawn("PI", [13, 0], 2)
+        trial.game_map.remove_unit([13, 3])
+        self.assertFalse(game.game_map[13, 3][0].upgraded, "Upgrading a clone changed the original unit")
+        self.assertEqual(75.0, game.game_map.stationary_health[13 * 28 + 3], "Original arrays changed")
+        self.assertEqual(0, len(game.game_map[13, 0]), "Deploying on a clone changed the original")
+        self.assertEqual(40.0, game.get_resource(game.CORES), "Spending on a clone changed the original")
+        self.assertEqual([], game._build_stack, "Building on a clone changed the original")
+        self.assertEqual(damage, game.get_damage_at([13, 6], 1), "Original coverage changed")
+        self.assertEqual(path, game.find_path_to_edge([13, 0]), "Original paths changed")
+        self.assertEqual(0, trial.get_damage_at([13, 6], 1), "Clone coverage was not updated")
+        self.assertEqual(2, len(trial.game_map[13, 0]), "Clone should hold its own deploys")
+
+    def test_rollback(self):
+        game = self.make_current_map(p1_units=[[], [], [[13, 3, 75.0, "1"]], [], [], [], [], []])
+        path = game.find_path_to_edge([13, 0])
+        damage = game.get_damage_at([13, 6], 1)
+        unit = game.game_map[13, 3][0]
+        with game.trial():
+            game.attempt_upgrade([13, 3])
+            game.attempt_spawn("FF", [[12, 1], [13, 1], [14, 1]])
+            outer = game.checkpoint()
+            game.attempt_spawn("PI", [13, 0], 2)
+            game.game_map.remove_unit([13, 3])
+            game.rollback(outer)
+            self.assertEqual(0, len(game.game_map[13, 0]), "Inner rollback should undo the deploy")
+            self.assertEqual(32, game.get_damage_at([13, 6], 1), "Inner rollback should restore the upgraded destructor")
+            self.assertEqual(4, len(game._build_stack), "Inner rollback should keep the outer builds")
+        self.assertIs(unit, game.game_map[13, 3][0], "Rollback should restore the original unit")
+        self.assertFalse(unit.upgraded, "Upgrading inside a trial changed the original unit")
+        self.assertEqual(damage, game.get_damage_at([13, 6], 1), "Coverage was not rolled back")
+        self.assertEqual(40.0, game.get_resource(game.CORES), "Resources were not rolled back")
+        self.assertEqual([], game._build_stack, "Builds were not rolled back")
+        self.assertEqual(path, game.find_path_to_edge([13, 0]), "Paths should match after rollback")
+
+        checkpoint = game.checkpoint()
+        game.attempt_spawn("FF", [13, 1])
+        game.commit(checkpoint)
+        self.assertTrue(game.contains_stationary_unit([13, 1]), "Committed changes should be kept")
+
+    def test_board_hash(self):
+        p1_units = [[], [], [[13, 3, 75.0, "1"]], [], [], [], [], [[13, 3, 0, ""]]]
+        game = self.make_current_map(p1_units)
+        lazy = self.make_current_map(p1_units, lazy=True)
+        empty = self.make_current_map().game_map.board_hash
+        self.assertNotEqual(empty, game.game_map.board_hash, "Firewalls should change the hash")
+        self.assertEqual(game.game_map.board_hash, lazy.game_map.board_hash, "Lazy parsing should give the same hash")
+
+        start = game.game_map.board_hash
+        clone = game.game_map.clone()
+        checkpoint = game.checkpoint()
+        game.attempt_spawn("FF", [13, 1])
+        game.attempt_spawn("PI", [13, 0])
+        changed = game.game_map.board_hash
+        self.assertNotEqual(start, changed, "Adding a firewall should change the hash")
+        game.game_map.remove_unit([13, 3])
+        game.game_map.add_unit("DF", [13, 3])
+        game.game_map.upgrade_unit([13, 3])
+        self.assertEqual(changed, game.game_map.board_hash, "The same layout should give the same hash")
+        game.rollback(checkpoint)
+        self.assertEqual(start, game.game_map.board_hash, "Rollback should restore the hash")
+        self.assertEqual(start, clone.board_hash, "Clones should keep their own hash")
+        clone.remove_unit([13, 3])
+        self.assertEqual(empty, clone.board_hash, "Removing every firewall should give the empty hash")
+
+    def test_lru_cache(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(1, cache.get("a"), "Cached values should be returned")
+        cache.put("c", 3)
+        self.assertNotIn("b", cache, "The least recently used entry should be evicted")
+        self.assertIsNone(cache.get("b"), "Evicted entries should be missed")
+        self.assertEqual((1, 1, 1), (cache.hits, cache.misses, cache.evictions), "Counters are wrong")
+        self.assertEqual(0.5, cache.hit_rate(), "Hit rate is wrong")
+        cache.resize(1)
+        self.assertEqual(1, len(cache), "Shrinking should evict entries")
+
+    def test_lazy_parsing(self):
+        p1_units = [[[12, 2, 40.0, "1"]], [], [[13, 3, 75.0, "2"]], [], [], [], [[12, 2, 0, ""]], [[13, 3, 0, ""]]]
+        p2_units = [[], [], [[14, 24, 0, "3"]], [], [], [], [], []]
+        eager = self.make_current_map(p1_units, p2_units)
+        game = self.make_current_map(p1_units, p2_units, lazy=True)
+        self.assertEqual(40.0, game.get_resource(game.CORES), "Resources should be parsed up front")
+        self.assertIsNone(game._game_map, "The map should not be built until it is used")
+
+        game_map = game.game_map
+        for name in ("stationary_owner", "stationary_type", "stationary_health", "stationary_upgraded"):
+            self.assertEqual(getattr(eager.game_map, name), getattr(game_map, name), "Lazy {} does not match".format(name))
+        self.assertTrue(game.contains_stationary_unit([14, 24]), "Lazily parsed firewalls should block")
+        self.assertEqual(eager.find_path_to_edge([13, 0]), game.find_path_to_edge([13, 0]), "Paths should match eager parsing")
+        self.assertEqual(eager.get_damage_at([13, 6], 1), game.get_damage_at([13, 6], 1), "Coverage should match eager parsing")
+
+        unit = game_map[13, 3][0]
+        self.assertTrue(unit.upgraded, "Upgrades should be applied to lazily created units")
+        self.assertEqual(75.0, unit.health, "Lazily created units should keep their parsed health")
+        self.assertTrue(game_map[12, 2][0].pending_removal, "Removals should be applied to lazily created units")
+        self.assertEqual(eager.game_map[14, 24][0].health, game_map[14, 24][0].health, "A health of 0 should mean full health")
+
+    def test_codec(self):
+        turn = {"p2Units": [[], [], [], [], [], [], [], []], "turnInfo": [0, 3, -1], "p1Stats": [25.0, 12.0, 7.0, 0],
+                "p1Units": [[], [], [[13, 3, 75.0, "1"]], [], [], [], [], []], "p2Stats": [30.0, 40.0, 5.0, 0], "events": {}}
+        message = codec.decode_message(json.dumps(turn))
+        self.assertEqual(turn, message.parsed, "Decoded message does not match")
+        self.assertEqual(turn, json.loads(message), "A ParsedMessage should still be usable as a string")
+        self.assertIs(message.parsed, codec.parse(message), "Parsing a ParsedMessage should not decode it again")
+        self.assertIs(turn, codec.parse(turn), "Parsing a dict should return it")
+        self.assertEqual([["FF", 1, 2]], json.loads(codec.dumps([["FF", 1, 2]])), "Encoding does not round trip")
+
+        for state in (message, turn, json.dumps(turn)):
+            game = GameState(json.loads(CURRENT_CONFIG), state)
+            self.assertEqual(3, game.turn_number, "Turn number was not parsed")
+            self.assertEqual(12.0, game.get_resource(game.CORES), "Resources were not parsed")
+            self.assertTrue(game.contains_stationary_unit([13, 3]), "Units were not parsed")
+
+    def test_action_frame_filter(self):
+        def frame(breaches):
+            return json.dumps({"turnInfo": [1, 3, 0], "events": {"breach": breaches, "death": [], "move": [[[13, 0]]]}})
+        turn = json.dumps({"turnInfo": [0, 3, -1]})
+        self.assertEqual(1, codec.message_type(frame([])), "Could not read the message type")
+        self.assertEqual(0, codec.message_type('{"turnInfo": [ 0, 3, -1]}'), "Whitespace should be skipped")
+        self.assertFalse(codec.has_any_event(frame([]), ["breach", "death", "shield"]), "Empty and missing events should not count")
+        self.assertTrue(codec.has_any_event(frame([[[1, 12], 1]]), ["breach"]), "Breach was missed")
+
+        algo = AlgoCore()
+        self.assertFalse(algo._skip_action_frame(frame([])), "Every frame should be passed by default")
+        algo.set_action_frame_filter(["breach", "death"])
+        self.assertTrue(algo._skip_action_frame(frame([])), "Frames without wanted events should be skipped")
+        self.assertFalse(algo._skip_action_frame(frame([[[1, 12], 1]])), "Frames with a breach should be passed")
+        self.assertFalse(algo._skip_action_frame(turn), "Turns should never be skipped")
+
+        algo.set_action_frame_filter(interval=3)
+        passed = [not algo._skip_action_frame(frame([])) for _ in range(7)]
+        self.assertEqual([True, False, False, True, False, False, True], passed, "Every third frame should be passed")
+        algo._skip_action_frame(turn)
+        self.assertFalse(algo._skip_action_frame(frame([])), "A new turn should restart the frame count")
+
+    def test_unit_stats(self):
+        config = json.loads(CURRENT_CONFIG)
+        first = GameUnit("DF", config, 0, None, 13, 3)
+        second = GameUnit("DF", config, 1, 10.0, 14, 24)
+        self.assertIs(first._stats, second._stats, "Units of the same type should share their stats")
+        self.assertEqual(10.0, second.health, "Health should be per unit")
+        self.assertEqual(config["unitInformation"][2]["startHealth"], first.max_health, "Max health was not read from the config")
+
+        mine = GameUnit("DF", config, 0, None, 12, 3)
+        mine.attackRange = 10
+        mine.note = "front line"
+        self.assertEqual(10, mine.attackRange, "Stats should be settable per unit")
+        self.assertEqual(config["unitInformation"][2]["attackRange"], first.attackRange, "Setting a stat changed other units")
+        self.assertIs(first._stats, get_unit_stats(config, "DF"), "Setting a stat changed the shared stats")
+        self.assertEqual("front line", mine.note, "Units should accept extra attributes")
+
+        second.upgrade()
+        upgrade = config["unitInformation"][2]["upgrade"]
+        self.assertTrue(second.upgraded, "Unit was not upgraded")
+        self.assertEqual(upgrade["attackDamageWalker"], second.damage_i, "Upgrade stats were not applied")
+        self.assertEqual(config["unitInformation"][2]["attackDamageWalker"], first.damage_i, "Upgrading one unit changed another")
+        self.assertEqual(first.cost[0] + upgrade.get("cost1", 0), second.cost[0], "Upgrade cost should be added to the base cost")
+        self.assertIn("upgraded", str(second), "Upgraded units should say so when printed")
+
+    def test_turn_budget(self):
+        now = [0.0]
+        budget = TurnBudget(json.loads(CURRENT_CONFIG), safety_margin=0.5, clock=lambda: now[0])
+        self.assertEqual(5.0, budget.soft_limit, "Soft limit was not read from the config")
+        self.assertEqual(35.0, budget.hard_limit, "Hard limit was not read from the config")
+
+        budget.start_turn()
+        now[0] = 1.0
+        self.assertAlmostEqual(3.5, budget.remaining(), msg="Remaining time should leave the safety margin")
+
+        def score(candidate):
+            now[0] += 1.0
+            return candidate
+        self.assertEqual((5, 5), budget.anytime([1, 5, 2, 9], score), "Anytime search should stop before running out of time")
+        self.assertFalse(budget.expired(), "Anytime search should stop before the deadline")
+        now[0] = 4.5
+        self.assertTrue(budget.expired(), "Turn should be out of time")
+        self.assertEqual((1, 1), budget.anytime([1, 5], score), "The first candidate should always be evaluated")
+
+        self.assertAlmostEqual(5.5, budget.end_turn(), msg="Turn time was not recorded")
+        budget.start_turn()
+        now[0] = 0.0
+        def search(depth):
+            now[0] += 0.1 * 2 ** depth
+            return depth
+        result, depth = budget.iterative_deepening(search)
+        self.assertEqual(result, depth, "Result should come from the deepest finished search")
+        self.assertLessEqual(budget.elapsed(), budget.soft_limit - budget.safety_margin, "Deepening should not run past the deadline")
+        self.assertEqual((3, 3), budget.iterative_deepening(search, max_depth=3), "Deepening should stop at max_depth")
+        budget.end_turn()
+        self.assertEqual(2, budget.stats()["turns"], "Turns were not recorded")
+
+    def test_background_task(self):
+        started = threading.Event()
+        def plan(cancel_event, start):
+            started.set()
+            cancel_event.wait()
+            return start + 1
+
+        algo = AlgoCore()
+        algo.background_timeout = None
+        task = algo.run_in_background(plan, 10)
+        started.wait()
+        self.assertFalse(task.done(), "Task should keep running until cancelled")
+        algo._collect_background()
+        self.assertTrue(task.cancel_event.is_set(), "Task was not cancelled")
+        self.assertEqual(11, algo.background_result, "Result was not collected")
+        self.assertIsNone(algo.background_task, "Collected tasks should be cleared")
+
+        def fail(cancel_event):
+            raise ValueError("planning failed")
+        algo.run_in_background(fail)
+        algo._collect_background()
+        self.assertIsNone(algo.background_result, "A failed task should have no result")
+
+        # A task that ignores the cancel event is dropped once the timeout runs out
+        release = threading.Event()
+        def stuck(cancel_event):
+            release.wait()
+            return 1
+        task = BackgroundTask(stuck).start()
+        try:
+            self.assertIsNone(task.collect(0), "A task that has not returned should have no result")
+            self.assertFalse(task.done(), "Task should still be running")
+        finally:
+            release.set()
+        task.wait()
+        self.assertEqual(1, task.result, "Task should finish once released")
+
+    def test_worker_pool(self):
+        game = self.make_current_map(p2_units=[[], [], [[24, 14, 75.0, "1"]], [], [], [], [], []])
+        candidates = [[13, 0], [14, 0], [3, 10], None, [24, 10]]
+        expected = [path_length(game, location) if location else None for location in candidates]
+        manager = multiprocessing.Manager()
+        event = manager.Event()
+        pool = WorkerPool(2)
+        try:
+            self.assertEqual(2, pool.workers, "Workers were not started")
+            pool.set_snapshot(game)
+            self.assertEqual(expected, pool.map(path_length, candidates, chunksize=1), "Workers should evaluate against the snapshot")
+
+            game.attempt_spawn("FF", [12, 1])
+            pool.set_snapshot(game)
+            self.assertEqual(path_length(game, [13, 0]), pool.map(path_length, [[13, 0]])[0], "Workers should load the new snapshot")
+
+            # The workers block until the event is set, so the map always times out
+            self.assertEqual([None] * 4, pool.map(wait_for_event, [event] * 4, chunksize=1, timeout=0.01), "Timed out candidates should be None")
+            name = pool._WorkerPool__block.name
+            pool.set_snapshot(game)
+            block = shared_memory.SharedMemory(name=name)
+            block.close()
+            event.set()
+            self.assertEqual(path_length(game, [14, 0]), pool.map(path_length, [[14, 0]])[0], "Workers should load the snapshot after a timeout")
+        finally:
+            event.set()
+            pool.shutdown()
+            manager.shutdown()
+        self.assertEqual(0, pool.workers, "Shut down pools should have no workers")
+
+        serial = WorkerPool(0)
+        serial.set_snapshot(game)
+        self.assertEqual([path_length(game, [14, 0]), None], serial.map(path_length, [[14, 0], None]), "Without workers candidates should be evaluated in process")
+
+    def test_logging(self):
+        class Loud:
+            formatted = 0
+            def __str__(self):
+                Loud.formatted += 1
+                return "loud"
+        stderr = io.StringIO()
+        with unittest.mock.patch("sys.stderr", stderr):
+            try:
+                util.set_log_level(util.WARNING)
+                util.log(util.DEBUG, "dropped {}", Loud())
+                self.assertEqual(0, Loud.formatted, "Dropped messages should not be formatted")
+
+                util.set_log_buffering(True, capacity=2)
+                for number in range(2):
+                    util.log(util.ERROR, "message {}", number)
+                self.assertEqual("", stderr.getvalue(), "Buffered messages should not be written yet")
+                util.log(util.ERROR, "message 2")
+                self.assertEqual("message 0\nmessage 1\n", stderr.getvalue(), "A full buffer should be flushed, not dropped")
+                util.flush_log()
+                self.assertEqual("message 0\nmessage 1\nmessage 2\n", stderr.getvalue(), "Buffer was not flushed")
+
+                util.set_log_level(util.DEBUG)
+                with unittest.mock.patch("sys.stdin", io.StringIO("")):
+                    with self.assertRaises(SystemExit):
+                        util.get_command()
+                self.assertTrue(stderr.getvalue().endswith("Got EOF, parent game process must have died, exiting for cleanup\n"),
+                                "Buffered messages should be written before exiting")
+
+                util.set_log_level(util.OFF)
+                util.debug_write(Loud())
+                util.log(util.ERROR, "off")
+                util.flush_log()
+                self.assertEqual(0, Loud.formatted, "Nothing should be written when logging is off")
+            finally:
+                util.set_log_buffering(False)
+                util.set_log_level(util.DEBUG)
+
+    def test_end_of_game_log(self):
+        end_state = json.dumps({"turnInfo": [2, 5, -1], "p1Stats": [30.0, 40.0, 5.0, 0], "p2Stats": [30.0, 40.0, 5.0, 0],
+                                "p1Units": [], "p2Units": [], "events": {}})
+        stdin = io.StringIO(CURRENT_CONFIG.replace("\n", " ") + "\n" + end_state + "\n")
+        stderr = io.StringIO()
+        with unittest.mock.patch("sys.stdin", stdin), unittest.mock.patch("sys.stderr", stderr):
+            try:
+                util.set_log_buffering(True)
+                AlgoCore().start()
+                self.assertIn("Turn times: 0 turns", stderr.getvalue(), "The turn time summary should be flushed at the end of the game")
+            finally:
+                util.set_log_buffering(False)
+
+    def test_simulator(self):
+        game = self.make_current_map()
+        game.attempt_spawn("PI", [13, 0])
+        path = game.find_path_to_edge([13, 0])
+        result = simulator.simulate(game)
+        self.assertEqual(len(path) - 1, result.frames, "The ping should breach after walking its path")
+        self.assertEqual([(path[-1], 0, 1.0)], result.breaches, "Breach was not recorded")
+        self.assertEqual([30.0, 29.0], result.health, "Breach damage was not applied")
+        self.assertEqual({'cores': 41.0, 'bits': 4.0}, result.resources[0], "Breach should give cores")
+        self.assertEqual(30.0, game.enemy_health, "Simulating should not change the game state")
+        self.assertEqual(1, len(game.game_map[13, 0]), "Simulating should not move units on the game state")
+
+        game = self.make_current_map(p2_units=[[], [], [[24, 14, 75.0, "1"], [25, 14, 75.0, "2"]], [], [], [], [], []])
+        result = simulator.simulate(game, my_deploys=[("PI", 13, 0)] * 2, enemy_deploys=[("SI", 14, 27)])
+        dead = [death[0] for death in result.deaths if death[2] == 0]
+        self.assertEqual(["PI", "PI"], dead, "Destructors should kill both pings")
+        self.assertGreater(result.damage_dealt[1], 0, "Enemy damage was not counted")
+        self.assertEqual(29.0, result.health[0], "The scrambler should breach")
+
+        frame = {"turnInfo": [1, 3, 0], "p1Stats": [30.0, 40.0, 5.0, 0], "p2Stats": [30.0, 40.0, 5.0, 0],
+                 "p1Units": [[], [], [], [[13, 0, 15.0, "1"]], [], [], [], []], "p2Units": [[]] * 8, "events": {}}
+        moved = json.loads(json.dumps(frame))
+        moved["turnInfo"][2] = 1
+        moved["p1Units"][3] = [[path[1][0], path[1][1], 15.0, "1"]]
+        replay = [CURRENT_CONFIG.replace("\n", ""), json.dumps(frame), json.dumps(moved)]
+        self.assertEqual([], simulator.compare_with_replay(json.loads(CURRENT_CONFIG), replay), "Simulation should match the replay")
+        moved["p1Units"][3][0][2] = 10.0
+        replay[2] = json.dumps(moved)
+        self.assertEqual(1, len(simulator.compare_with_replay(json.loads(CURRENT_CONFIG), replay)), "Mismatched health was not found")
+
+    def test_simulator_frame_order(self):
+        # A ping with 1 health is destroyed by the first attack of the frame and does not attack back
+        game = self.make_current_map(p1_units=[[], [], [], [[13, 12, 15.0, "1"]], [], [], [], []],
+                                     p2_units=[[], [], [], [[13, 15, 1.0, "2"]], [], [], [], []])
+        result = simulator.simulate(game, max_frames=1)
+        self.assertEqual([("PI", [13, 14], 1, 1)], result.deaths, "The weak ping should be destroyed on the first frame")
+        self.assertEqual([2.0, 0.0], result.damage_dealt, "Destroyed attackers should not attack")
+
+        # Both destructors pick the ping with the least health, and the second one hits it again after it is destroyed
+        game = self.make_current_map(p1_units=[[], [], [[13, 13, 75.0, "1"], [12, 13, 75.0, "2"]], [], [], [], [], []],
+                                     p2_units=[[], [], [], [[13, 16, 1.0, "3"], [13, 16, 15.0, "4"]], [], [], [], []])
+        result = simulator.simulate(game, max_frames=1)
+        self.assertEqual(32, result.damage_dealt[0], "Both destructors should attack")
+        self.assertIn((1, "PI", 13, 15, 15.0), simulator.snapshot_units(result.game_state), "Destroyed units should still draw attacks until the frame ends")
+
+        # Two pings self destruct at the end of a dead end next to a filter. The pings' attacks deal 12 damage on the way, 
+        # so a filter with 20 health is destroyed by the first self destruct and the second one skips it
+        walls = [[12, y, 60.0, ""] for y in range(8, 14)] + [[14, y, 60.0, ""] for y in range(8, 14)] + [[13, 7, 60.0, ""]]
+        for filter_health, damage in ((20.0, 27.0), (30.0, 42.0)):
+            game = self.make_current_map(p1_units=[walls, [], [], [], [], [], [], []], p2_units=[[[13, 14, filter_health, ""]], [], [], [], [], [], [], []])
+            result = simulator.simulate(game, my_deploys=[("PI", 13, 8)] * 2)
+            self.assertEqual(2, len(result.self_destructs), "Both pings should self destruct")
+            self.assertEqual(damage, result.damage_dealt[0], "Self destructs should only damage units with health left")
+
+    def test_simulate_batch(self):
+        game = self.make_current_map(p2_units=[[], [], [[24, 14, 75.0, "1"], [25, 14, 75.0, "2"]], [], [], [], [], []])
+        candidates = [[("SI", 13, 0)] * 3, [("SI", 14, 0)] * 3, [("SI", 13, 0), ("SI", 14, 0)], []]
+        for use_numpy in (True, False):
+            batch = simulator.simulate_batch(game, candidates, use_numpy=use_numpy)
+            for index, deploys in enumerate(candidates):
+                result = simulator.simulate(game, my_deploys=deploys)
+                lost = sum(1 for death in result.deaths if death[2] == 0)
+                self.assertEqual(result.breach_damage(0), batch.breach_damage[index], "Breaches should match simulate")
+                self.assertEqual(lost, batch.units_lost[index], "Losses should match simulate")
+            self.assertEqual(batch.breach_damage, batch.scores, "Scramblers do not damage firewalls, so only breaches score")
+            self.assertEqual(1, batch.best(), "The path away from the destructors should be best")
+        self.assertIsNone(simulator.simulate_batch(game, []).best(), "No candidates should have no best")
+
+        config = json.loads(CURRENT_CONFIG)
+        config["unitInformation"][5]["speed"] = 0
+        still = GameState(config, json.dumps({"p1Units": [[]] * 8, "p2Units": [[]] * 8, "turnInfo": [0, 0, -1],
+                                              "p1Stats": [30.0, 40.0, 5.0, 0], "p2Stats": [30.0, 40.0, 5.0, 0], "events": {}}))
+        result = simulator.simulate(still, my_deploys=[("SI", 13, 0)], max_frames=100)
+        for use_numpy in (True, False):
+            batch = simulator.simulate_batch(still, [[("SI", 13, 0)]], max_frames=100, use_numpy=use_numpy)
+            self.assertEqual(result.breach_damage(0), batch.breach_damage[0], "Units with no speed should never move, like in simulate")
+            self.assertEqual(0, batch.breach_damage[0], "Units with no speed should never breach")
@@ -9,9 +9,100 @@ def is_stationary(unit_type, firewall_types):
     return unit_type in firewall_types
 
 
+class UnitStats:
+    """The stats shared by every unit of one type, either upgraded or not, under one config. 
+    Built once per config by get_unit_stats and shared by all GameUnits of that type.
+
+    Attributes :
+        * stationary (bool): Whether or not this type is a firewall
+        * speed (float): A unit will move once every 1/speed frames
+        * damage_f (int): The amount of damage dealt to enemy firewalls
+        * damage_i (int): The amount of damage dealt to enemy information
+        * attackRange (float): The attack range
+        * shieldRange (float): The shield range
+        * max_health (float): The starting health
+        * shieldPerUnit (float): The shield given to each information unit in range
+        * cost (list): The cost in cores and bits. Shared, so it must not be changed
+
+    """
+    __slots__ = ("stationary", "speed", "damage_f", "damage_i", "attackRange", "shieldRange", "max_health", "shieldPerUnit", "cost")
+
+    def __init__(self, type_config, base=None):
+        """Reads the stats of a type from its unitInformation entry, or of an upgraded type from the entry's 
+        "upgrade" section on top of the base stats
+        """
+        if base is None:
+            self.stationary = type_config["unitCategory"] == 0
+            self.speed = type_config.get("speed", 0)
+            self.damage_f = type_config.get("attackDamageTower", 0)
+            self.damage_i = type_config.get("attackDamageWalker", 0)
+            self.attackRange = type_config.get("attackRange", 0)
+            self.shieldRange = type_config.get("shieldRange", 0)
+            self.max_health = type_config.get("startHealth", 0)
+            self.shieldPerUnit = type_config.get("shieldPerUnit", 0)
+            self.cost = [type_config.get("cost1", 0), type_config.get("cost2", 0)]
+            return
+        upgrade = type_config.get("upgrade", {})
+        self.stationary = base.stationary
+        self.speed = upgrade.get("speed", base.speed)
+        self.damage_f = upgrade.get("attackDamageTower", base.damage_f)
+        self.damage_i = upgrade.get("attackDamageWalker", base.damage_i)
+        self.attackRange = upgrade.get("attackRange", base.attackRange)
+        self.shieldRange = upgrade.get("shieldRange", base.shieldRange)
+        self.max_health = upgrade.get("startHealth", base.max_health)
+        self.shieldPerUnit = upgrade.get("shieldPerUnit", base.shieldPerUnit)
+        self.cost = [upgrade.get("cost1", 0) + base.cost[0], upgrade.get("cost2", 0) + base.cost[1]]
+
+# Unit stats of the most recently used configs, keyed by id(config). Each entry keeps a reference to its 
+# config so the id can not be reused while the entry exists.
+_STATS_BY_CONFIG = {}
+_MAX_CONFIGS = 8
+
+def get_unit_stats(config, unit_type, upgraded=False):
+    """Gets the shared stats of a unit type, building the stats of every type in config the first time config is used
+
+    Args:
+        config: Contains information about the game
+        unit_type: The shorthand of the unit type
+        upgraded: Whether to get the stats of the upgraded type
+
+    Returns:
+        The UnitStats of the type
+    """
+    entry = _STATS_BY_CONFIG.get(id(config))
+    if entry is None or entry[0] is not config:
+        if len(_STATS_BY_CONFIG) >= _MAX_CONFIGS:
+            _STATS_BY_CONFIG.clear()
+        table = {}
+        for type_config in config["unitInformation"]:
+            if "unitCategory" not in type_config:
+                continue
+            base = UnitStats(type_config)
+            table[(type_config.get("shorthand"), False)] = base
+            table[(type_config.get("shorthand"), True)] = UnitStats(type_config, base)
+        entry = (config, table)
+        _STATS_BY_CONFIG[id(config)] = entry
+    return entry[1][(unit_type, upgraded)]
+
+
+def _stat_property(name):
+    """Makes a GameUnit property that reads a stat from the unit's UnitStats, 
+    and gives the unit its own copy of the stats when the stat is set
+    """
+    def get(self):
+        return getattr(self._stats, name)
+    def set(self, value):
+        setattr(self._own_stats(), name, value)
+    return property(get, set)
+
+
 class GameUnit:
     """Holds information about a Unit. 
 
+    The stats that only depend on the unit's type and whether it is upgraded are shared by every unit 
+    of the same kind through a UnitStats record. Setting one of them gives the unit its own copy of the 
+    record, until upgrade() replaces it with the shared upgraded stats.
+
     Attributes :
         * unit_type (string): This unit's type
         * config (JSON): Contains information about the game
@@ -28,6 +119,9 @@ class GameUnit:
         * cost (int): The resource cost of this unit
 
     """
+    # __dict__ lets algos keep their own attributes on units, the common fields stay in slots
+    __slots__ = ("unit_type", "config", "player_index", "pending_removal", "upgraded", "x", "y", "health", "_stats", "__dict__")
+
     def __init__(self, unit_type, config, player_index=None, health=None, x=-1, y=-1):
         """ Initialize unit variables using args passed
 
@@ -39,39 +133,44 @@ class GameUnit:
         self.upgraded = False
         self.x = x
         self.y = y
-        self.__serialize_type()
-        self.health = self.max_health if not health else health
-
-    def __serialize_type(self):
-        from .game_state import FIREWALL_TYPES, UNIT_TYPE_TO_INDEX, ENCRYPTOR
-        type_config = self.config["unitInformation"][UNIT_TYPE_TO_INDEX[self.unit_type]]
-        self.stationary = type_config["unitCategory"] == 0
-        self.speed = type_config.get("speed", 0)
-        self.damage_f = type_config.get("attackDamageTower", 0)
-        self.damage_i = type_config.get("attackDamageWalker", 0)
-        self.attackRange = type_config.get("attackRange", 0)
-        self.shieldRange = type_config.get("shieldRange", 0)
-        self.max_health = type_config.get("startHealth", 0)
-        self.shieldPerUnit = type_config.get("shieldPerUnit", 0)
-        self.cost = [type_config.get("cost1", 0), type_config.get("cost2", 0)]
-
+        self._stats = get_unit_stats(config, unit_type)
+        self.health = self._stats.max_health if not health else health
 
     def upgrade(self):
-        from .game_state import UNIT_TYPE_TO_INDEX
-        type_config = self.config["unitInformation"][UNIT_TYPE_TO_INDEX[self.unit_type]].get("upgrade", {})
-        self.speed = type_config.get("speed", self.speed)
-        self.damage_f = type_config.get("attackDamageTower", self.damage_f)
-        self.damage_i = type_config.get("attackDamageWalker", self.damage_i)
-        self.attackRange = type_config.get("attackRange", self.attackRange)
-        self.shieldRange = type_config.get("shieldRange", self.shieldRange)
-        self.max_health = type_config.get("startHealth", self.max_health)
-        self.shieldPerUnit = type_config.get("shieldPerUnit", self.shieldPerUnit)
-        self.cost = [type_config.get("cost1", 0) + self.cost[0], type_config.get("cost2", 0) + self.cost[1]]
+        self.upgraded = True
+        self._stats = get_unit_stats(self.config, self.unit_type, True)
+
+    def _own_stats(self):
+        """Gives this unit its own copy of its stats before one of them is set, so other units keep the shared ones
+        """
+        stats = UnitStats.__new__(UnitStats)
+        for name in UnitStats.__slots__:
+            setattr(stats, name, getattr(self._stats, name))
+        stats.cost = list(stats.cost)
+        self._stats = stats
+        return stats
 
+    stationary = _stat_property("stationary")
+    speed = _stat_property("speed")
+    damage_f = _stat_property("damage_f")
+    damage_i = _stat_property("damage_i")
+    attackRange = _stat_property("attackRange")
+    shieldRange = _stat_property("shieldRange")
+    max_health = _stat_property("max_health")
+    shieldPerUnit = _stat_property("shieldPerUnit")
+
+    @property
+    def cost(self):
+        return list(self._stats.cost)
+
+    @cost.setter
+    def cost(self, value):
+        self._own_stats().cost = list(value)
 
     def __toString(self):
         owner = "Friendly" if self.player_index == 0 else "Enemy"
         removal = ", pending removal" if self.pending_removal else ""
+        upgrade = ", upgraded" if self.upgraded else ""
         return "{} {}, health: {} location: {} removal: {} upgrade: {} ".format(owner, self.unit_type, self.health, [self.x, self.y], removal, upgrade)
 
     def __str__(self):
@@ -79,4 +178,3 @@ class GameUnit:
 
     def __repr__(self):
         return self.__toString()
-
@@ -1,4 +1,6 @@
 import sys
+import atexit
+from collections import deque
 
 
 BANNER_TEXT = "---------------- Starting Your Algo --------------------"
@@ -13,11 +15,13 @@ def get_command():
     except EOFError:
         # Game parent process terminated so exit
         debug_write("Got EOF, parent game process must have died, exiting for cleanup")
+        flush_log()
         exit()
     if ret == "":
         # Happens if parent game process dies, so exit for cleanup, 
         # Don't change or starter-algo process won't exit even though the game has closed
         debug_write("Got EOF, parent game process must have died, exiting for cleanup")
+        flush_log()
         exit()
     return ret
 
@@ -29,13 +33,95 @@ def send_command(cmd):
     sys.stdout.write(cmd.strip() + "\n")
     sys.stdout.flush()
 
+# Log levels, in increasing order of importance. Messages below the current level are dropped before they are formatted.
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+
+_log_level = DEBUG
+_log_buffer = None
+
+def set_log_level(level):
+    """Sets the least important level of messages that are written. Use OFF to drop every message.
+
+    Args:
+        level: DEBUG, INFO, WARNING, ERROR or OFF
+
+    """
+    global _log_level
+    _log_level = level
+
+def is_logging(level):
+    """Checks whether messages of a level are currently written. 
+    Use it to skip building expensive log arguments altogether.
+
+    Args:
+        level: DEBUG, INFO, WARNING or ERROR
+
+    """
+    return level >= _log_level
+
+def set_log_buffering(buffered, capacity=1000):
+    """Keeps messages in memory instead of writing each one to stderr straight away. 
+    Buffered messages are written in one go by flush_log, which AlgoCore calls after every turn and 
+    action frame, and which also runs when the algo exits. Buffering is off unless you turn it on.
+
+    Args:
+        buffered: If true, buffer messages. If false, write any buffered messages and stop buffering.
+        capacity: The most messages kept between flushes. The buffer is flushed when it is full, so no message is lost.
+
+    """
+    global _log_buffer
+    flush_log()
+    _log_buffer = deque(maxlen=capacity) if buffered else None
+
+def flush_log():
+    """Writes every buffered message to stderr
+    """
+    if not _log_buffer:
+        return
+    messages = []
+    while _log_buffer:
+        messages.append(_log_buffer.popleft())
+    sys.stderr.write("\n".join(messages) + "\n")
+    sys.stderr.flush()
+
+# Buffered messages are written however the algo exits, including on crashes and exit() calls
+atexit.register(flush_log)
+
+def log(level, message, *args):
+    """Writes a message to the games debug output, if its level is being logged.
+
+    The message is only formatted with args when it is written, so passing the arguments 
+    instead of formatting them yourself costs almost nothing when the message is dropped.
+
+    Args:
+        level: DEBUG, INFO, WARNING or ERROR
+        message: The message, with {} for each of args
+        args: Values to format into the message
+
+    """
+    if level < _log_level:
+        return
+    text = (message.format(*args) if args else str(message)).strip()
+    if _log_buffer is None:
+        sys.stderr.write(text + "\n")
+        sys.stderr.flush()
+        return
+    if len(_log_buffer) == _log_buffer.maxlen:
+        flush_log()
+    _log_buffer.append(text)
+
 def debug_write(*msg):
-    """Prints a message to the games debug output
+    """Prints a message to the games debug output, at the INFO level
 
     Args:
         msg: The message to output
 
     """
     #Printing to STDERR is okay and printed out by the game but doesn't effect turns.
-    sys.stderr.write(", ".join(map(str, msg)).strip() + "\n")
-    sys.stderr.flush()
+    if INFO < _log_level:
+        return
+    log(INFO, ", ".join(map(str, msg)))